@@ -2,26 +2,123 @@
 Interactive CLI for the marketplace analyzer with CrewAI integration.
 A production-grade Pakistani e-commerce price intelligence system.
 """
-import asyncio
 import argparse
+import importlib
+import os
 import sys
+import functools
 import time
-from datetime import datetime
-from dotenv import load_dotenv
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
-from rich.prompt import Prompt, Confirm
-from rich.table import Table
-from rich.text import Text
-from rich import print as rprint
 
-from src.crew.crew import run_clean_marketplace_analysis
 
-# Load environment variables
-load_dotenv()
+@functools.lru_cache(maxsize=1)
+def _ensure_env():
+    """Load .env on first use so paths that never run an analysis skip it."""
+    from dotenv import load_dotenv
+    load_dotenv()
 
-console = Console()
+# rich pulls in pygments lexers and markup parsers at import time, so the
+# widgets are resolved lazily on first use instead of eagerly at startup.
+_RICH_EXPORTS = {
+    'Console': ('rich.console', 'Console'),
+    'Panel': ('rich.panel', 'Panel'),
+    'Progress': ('rich.progress', 'Progress'),
+    'SpinnerColumn': ('rich.progress', 'SpinnerColumn'),
+    'TextColumn': ('rich.progress', 'TextColumn'),
+    'TimeElapsedColumn': ('rich.progress', 'TimeElapsedColumn'),
+    'Prompt': ('rich.prompt', 'Prompt'),
+    'Confirm': ('rich.prompt', 'Confirm'),
+    'Table': ('rich.table', 'Table'),
+}
+
+
+def _rich(name):
+    """Resolve a rich export on first use and cache it in module globals."""
+    value = globals().get(name)
+    if value is None:
+        module_name, attr = _RICH_EXPORTS[name]
+        value = getattr(importlib.import_module(module_name), attr)
+        globals()[name] = value
+    return value
+
+
+def __getattr__(name):
+    """PEP 562 lazy attribute access for the rich exports."""
+    if name in _RICH_EXPORTS:
+        return _rich(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Precomposed copy of build_parser()'s help output so a bare --help never
+# has to construct the ArgumentParser and its action objects. Keep in sync
+# with build_parser() when arguments change.
+_HELP_STR = """\
+usage: main.py [-h] [--max-results MAX_RESULTS] [--index INDEX] [--headful]
+               [--timeout TIMEOUT] [-i]
+               [query]
+
+Pakistani E-commerce Marketplace Analyzer with CrewAI
+
+positional arguments:
+  query                 Product search query (e.g., 'iPhone 15', 'Portable SSD
+                        500GB')
+
+options:
+  -h, --help            show this help message and exit
+  --max-results MAX_RESULTS
+                        Maximum results per marketplace (default: 3)
+  --index INDEX         Daraz result index to select (default: 0)
+  --headful             Run browser in headful mode for debugging
+  --timeout TIMEOUT     Browser timeout in milliseconds (default: 30000)
+  -i, --interactive     Run in interactive mode
+
+Examples:
+  python main.py "iPhone 15"
+  python main.py "Portable SSD 500GB" --max-results 5 --headful
+  python main.py "Gaming Laptop" --timeout 60000 --index 1
+"""
+
+# Interactive-loop constants, hoisted so each menu iteration reuses the
+# same objects instead of rebuilding lists and join buffers.
+_EXAMPLES = ("Laptop Dell", "Nike Air Max", "Office Chair", "iPhone 15",
+             "Samsung Galaxy", "Gaming Mouse", "Instant Pot")
+_EXAMPLES_DISPLAY = ", ".join(_EXAMPLES)
+_MENU_LINES = (
+    "\n[bold cyan]🏠 Main Menu[/bold cyan]",
+    "1. 🔍 Start New CrewAI Analysis",
+    "2. 🆘 Help & Tips",
+    "3. 🚪 Exit",
+)
+_MENU_CHOICES = ["1", "2", "3"]
+
+_console = None
+
+# Resolved lazily on first analysis run and reused across menu iterations.
+_RUN_ANALYSIS = None
+
+# Escape hatch for CI and debugging: lazy imports surface missing
+# dependencies only at first use, so PAKMA_EAGER_IMPORT=1 force-resolves
+# everything at startup (run `PAKMA_EAGER_IMPORT=1 python main.py --help`
+# as the import-surface test).
+if os.environ.get("PAKMA_EAGER_IMPORT"):
+    for _name in _RICH_EXPORTS:
+        _rich(_name)
+    import src.crew.crew  # noqa: F401
+
+
+def get_console():
+    """Get or lazily create the shared rich Console."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+# Panels are built once on first display and reused: Panel construction
+# re-parses the rich markup, and help can be reopened repeatedly from the
+# menu. Kept lazy so importing main.py never touches rich.
+_BANNER_PANEL = None
+_HELP_PANEL = None
 
 
 def display_banner():
@@ -38,34 +135,43 @@ def display_banner():
     
     ════════════════════════════════════════════
     """
-    console.print(Panel(banner, border_style="bright_blue", padding=(1, 2)))
+    global _BANNER_PANEL
+    if _BANNER_PANEL is None:
+        _BANNER_PANEL = _rich('Panel')(banner, border_style="bright_blue", padding=(1, 2))
+    get_console().print(_BANNER_PANEL)
+
+
+def _ask_int(label: str, default: int) -> int:
+    """Prompt for an integer, falling back to the default on bad input."""
+    value = _rich('Prompt').ask(label, default=str(default), show_default=True).strip()
+    # int() accepts everything isdigit() does plus signed forms like
+    # "+5"; exceptions only fire on genuinely bad input, which is the
+    # fall-back-to-default path anyway.
+    try:
+        return int(value)
+    except ValueError:
+        return default
 
 
 def get_user_preferences():
     """Get user preferences interactively."""
+    console = get_console()
+    Prompt = _rich('Prompt')
+    Confirm = _rich('Confirm')
     console.print("\n[bold cyan]🔧 Configure Your Search Settings[/bold cyan]")
     
     # Product query with diverse examples
-    examples = ["Laptop Dell", "Nike Air Max", "Office Chair", "iPhone 15", "Samsung Galaxy", "Gaming Mouse", "Instant Pot"]
-    default_query = examples[0]  # Use first example as default
-    
-    console.print(f"[dim]Examples: {', '.join(examples)}[/dim]")
+    default_query = _EXAMPLES[0]  # Use first example as default
+
+    console.print(f"[dim]Examples: {_EXAMPLES_DISPLAY}[/dim]")
     query = Prompt.ask(
         "[yellow]🔍 Enter product name to search for[/yellow]",
         default=default_query
     ).strip()
     
     # Max results
-    max_results = Prompt.ask(
-        "[yellow]📊 Maximum results per marketplace[/yellow]",
-        default="3",
-        show_default=True
-    )
-    try:
-        max_results = int(max_results)
-    except ValueError:
-        max_results = 3
-    
+    max_results = _ask_int("[yellow]📊 Maximum results per marketplace[/yellow]", 3)
+
     # Browser mode
     headless = not Confirm.ask(
         "[yellow]🖥️  Show browser window while scraping?[/yellow]",
@@ -73,16 +179,8 @@ def get_user_preferences():
     )
     
     # Timeout
-    timeout_seconds = Prompt.ask(
-        "[yellow]⏱️  Timeout per page (seconds)[/yellow]",
-        default="30",
-        show_default=True
-    )
-    try:
-        timeout = int(timeout_seconds) * 1000  # Convert to milliseconds
-    except ValueError:
-        timeout = 30000
-    
+    timeout = _ask_int("[yellow]⏱️  Timeout per page (seconds)[/yellow]", 30) * 1000  # Convert to milliseconds
+
     # Advanced options
     advanced = Confirm.ask(
         "[yellow]🔧 Configure advanced options?[/yellow]",
@@ -90,18 +188,10 @@ def get_user_preferences():
     )
     
     index = 0
-    
+
     if advanced:
-        index_input = Prompt.ask(
-            "[yellow]🎯 Daraz result index to select[/yellow]",
-            default="0",
-            show_default=True
-        )
-        try:
-            index = int(index_input)
-        except ValueError:
-            index = 0
-    
+        index = _ask_int("[yellow]🎯 Daraz result index to select[/yellow]", 0)
+
     return {
         'query': query,
         'max_results': max_results,
@@ -111,28 +201,46 @@ def get_user_preferences():
     }
 
 
+# Timestamp memoized per second: back-to-back progress lines within the
+# same second reuse the formatted string instead of re-running strftime.
+_last_ts_second = 0
+_last_ts_str = ""
+
+
+def _timestamp() -> str:
+    """Current HH:MM:SS, cached for same-second repeat calls."""
+    global _last_ts_second, _last_ts_str
+    now = int(time.time())
+    if now != _last_ts_second:
+        _last_ts_second = now
+        _last_ts_str = time.strftime("%H:%M:%S")
+    return _last_ts_str
+
+
 def display_progress_info(stage: str, details: str = ""):
     """Display current processing stage."""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    console.print(f"[dim]{timestamp}[/dim] [bold green]●[/bold green] {stage}", end="")
+    # One print per line: each console.print pays a markup parse and a
+    # stdout-lock acquisition, and this runs many times per analysis.
+    line = f"[dim]{_timestamp()}[/dim] [bold green]●[/bold green] {stage}"
     if details:
-        console.print(f" [dim]({details})[/dim]")
-    else:
-        console.print()
+        line += f" [dim]({details})[/dim]"
+    get_console().print(line)
 
 
 async def run_analysis_with_progress(config: dict):
     """Run the analysis with real-time progress updates."""
+    _ensure_env()
+    console = get_console()
     console.print(f"\n[bold cyan]🔍 Starting CrewAI Analysis: '{config['query']}'[/bold cyan]")
     console.print("─" * 50)
-    
+
     start_time = time.time()
-    
+
     # Create progress tracker
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[bold blue]{task.description}"),
-        TimeElapsedColumn(),
+    with _rich('Progress')(
+        _rich('SpinnerColumn')(),
+        _rich('TextColumn')("[bold blue]{task.description}"),
+        _rich('TimeElapsedColumn')(),
         console=console,
         transient=True,
     ) as progress:
@@ -144,8 +252,17 @@ async def run_analysis_with_progress(config: dict):
         )
         
         try:
+            # Import here so --help and menu-only sessions never pay the
+            # CrewAI/Groq/Playwright import cost. The resolved callable is
+            # memoized so repeated menu runs skip even the sys.modules and
+            # attribute lookups.
+            global _RUN_ANALYSIS
+            if _RUN_ANALYSIS is None:
+                from src.crew.crew import run_clean_marketplace_analysis_async
+                _RUN_ANALYSIS = run_clean_marketplace_analysis_async
+
             # Run the CLEAN CrewAI analysis
-            result = await run_clean_marketplace_analysis(
+            result = await _RUN_ANALYSIS(
                 query=config['query'],
                 index=config['index'],
                 headless=config['headless'],
@@ -167,6 +284,7 @@ async def run_analysis_with_progress(config: dict):
 
 def display_results(result: dict):
     """Display analysis results in a formatted way."""
+    console = get_console()
     if not result or result.get('status') != 'completed':
         console.print("[bold red]❌ Analysis was not completed successfully[/bold red]")
         if result and result.get('error'):
@@ -175,23 +293,32 @@ def display_results(result: dict):
     
     console.print("\n[bold green]📊 CREWAI ANALYSIS RESULTS[/bold green]")
     console.print("=" * 60)
-    
-    # Summary stats
-    stats_table = Table(title="Summary Statistics", show_header=True, header_style="bold magenta")
-    stats_table.add_column("Metric", style="cyan", no_wrap=True)
-    stats_table.add_column("Value", style="green")
-    
+
     results_data = result.get('results', {})
-    
-    stats_table.add_row("Query ID", str(result.get('query_id', 'N/A')))
-    stats_table.add_row("Status", f"✅ {result.get('status', 'Unknown')}")
-    stats_table.add_row("Products Found", str(results_data.get('total_products_found', 0)))
-    stats_table.add_row("Execution Time", result.get('execution_time', 'N/A'))
-    
-    console.print(stats_table)
-    
-    # Show cheapest options
     cheapest_options = results_data.get('cheapest_options', [])
+    reports = results_data.get('reports_generated', [])
+
+    # Fast path for empty runs: skip all Table construction.
+    if (results_data.get('total_products_found', 0) == 0
+            and not cheapest_options and not reports):
+        console.print("[yellow]⚠️  No results found for this query[/yellow]")
+        return
+
+    # Summary stats
+    Table = _rich('Table')
+    if results_data:
+        stats_table = Table(title="Summary Statistics", show_header=True, header_style="bold magenta")
+        stats_table.add_column("Metric", style="cyan", no_wrap=True)
+        stats_table.add_column("Value", style="green")
+
+        stats_table.add_row("Query ID", str(result.get('query_id', 'N/A')))
+        stats_table.add_row("Status", f"✅ {result.get('status', 'Unknown')}")
+        stats_table.add_row("Products Found", str(results_data.get('total_products_found', 0)))
+        stats_table.add_row("Execution Time", result.get('execution_time', 'N/A'))
+
+        console.print(stats_table)
+
+    # Show cheapest options
     if cheapest_options:
         console.print("\n[bold cyan]💰 PRICE COMPARISON[/bold cyan]")
         cheapest_table = Table(show_header=True, header_style="bold magenta")
@@ -200,22 +327,19 @@ def display_results(result: dict):
         cheapest_table.add_column("Price", style="yellow")
         cheapest_table.add_column("Delta", style="blue")
         
-        for i, option in enumerate(cheapest_options[:5], 1):
-            platform = option.get('platform', 'Unknown')
-            price = option.get('price', 'N/A')
-            delta = option.get('delta_from_cheapest', 'N/A')
-            
-            cheapest_table.add_row(
-                str(i),
-                platform,
-                price,
-                delta
-            )
-        
+        # Pre-materialize the cells so the dict lookups and str() calls
+        # happen outside rich's style/width machinery.
+        rows = [
+            (str(i), option.get('platform', 'Unknown'),
+             option.get('price', 'N/A'), option.get('delta_from_cheapest', 'N/A'))
+            for i, option in enumerate(cheapest_options[:5], 1)
+        ]
+        for row in rows:
+            cheapest_table.add_row(*row)
+
         console.print(cheapest_table)
     
     # Show reports generated
-    reports = results_data.get('reports_generated', [])
     if reports:
         console.print(f"\n[bold cyan]📄 REPORTS GENERATED[/bold cyan]")
         for report in reports:
@@ -263,22 +387,25 @@ def display_help():
     • Comprehensive error handling and logging
     • Structured data output with database storage
     """
-    console.print(Panel(help_text, border_style="yellow", padding=(1, 2)))
+    global _HELP_PANEL
+    if _HELP_PANEL is None:
+        _HELP_PANEL = _rich('Panel')(help_text, border_style="yellow", padding=(1, 2))
+    get_console().print(_HELP_PANEL)
 
 
 async def interactive_main():
     """Interactive main function."""
     display_banner()
-    
+    console = get_console()
+    Prompt = _rich('Prompt')
+
     while True:
-        console.print("\n[bold cyan]🏠 Main Menu[/bold cyan]")
-        console.print("1. 🔍 Start New CrewAI Analysis")
-        console.print("2. 🆘 Help & Tips")
-        console.print("3. 🚪 Exit")
-        
+        for line in _MENU_LINES:
+            console.print(line)
+
         choice = Prompt.ask(
             "[yellow]Select an option[/yellow]",
-            choices=["1", "2", "3"],
+            choices=_MENU_CHOICES,
             default="1"
         )
         
@@ -300,8 +427,8 @@ async def interactive_main():
             break
 
 
-async def cli_main():
-    """Main CLI entry point."""
+def build_parser():
+    """Build the argument parser."""
     parser = argparse.ArgumentParser(
         description="Pakistani E-commerce Marketplace Analyzer with CrewAI",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -312,52 +439,56 @@ Examples:
   python main.py "Gaming Laptop" --timeout 60000 --index 1
         """
     )
-    
+
     parser.add_argument(
         "query",
         nargs="?",
         help="Product search query (e.g., 'iPhone 15', 'Portable SSD 500GB')"
     )
-    
+
     parser.add_argument(
         "--max-results",
         type=int,
         default=3,
         help="Maximum results per marketplace (default: 3)"
     )
-    
+
     parser.add_argument(
         "--index",
         type=int,
         default=0,
         help="Daraz result index to select (default: 0)"
     )
-    
+
     parser.add_argument(
         "--headful",
         action="store_true",
         help="Run browser in headful mode for debugging"
     )
-    
+
     parser.add_argument(
         "--timeout",
         type=int,
         default=30000,
         help="Browser timeout in milliseconds (default: 30000)"
     )
-    
+
     parser.add_argument(
         "-i", "--interactive",
         action="store_true",
         help="Run in interactive mode"
     )
-    
-    args = parser.parse_args()
-    
+
+    return parser
+
+
+async def cli_main(args):
+    """Async CLI entry point for paths that need the event loop."""
     if args.interactive or not args.query:
         await interactive_main()
         return
-    
+
+    console = get_console()
     console.print("🚀 Pakistani E-commerce CrewAI Marketplace Analyzer")
     console.print("=" * 50)
     console.print(f"Query: {args.query}")
@@ -386,12 +517,28 @@ Examples:
         sys.exit(1)
 
 
+def main():
+    """Synchronous entry point; only the analysis paths touch asyncio."""
+    # Fast path: answer a bare --help from the precomposed constant
+    # without building the parser at all.
+    if len(sys.argv) == 2 and sys.argv[1] in ("-h", "--help"):
+        print(_HELP_STR)
+        return
+
+    args = build_parser().parse_args()
+
+    # argparse handles --help/errors above without ever reaching here, so
+    # asyncio's sizeable import graph is paid only when a loop is needed.
+    import asyncio
+    asyncio.run(cli_main(args))
+
+
 if __name__ == "__main__":
     try:
-        asyncio.run(cli_main())
+        main()
     except KeyboardInterrupt:
-        console.print("\n[bold red]❌ Interrupted by user[/bold red]")
+        get_console().print("\n[bold red]❌ Interrupted by user[/bold red]")
         sys.exit(1)
     except Exception as e:
-        console.print(f"\n[bold red]❌ Fatal error: {e}[/bold red]")
+        get_console().print(f"\n[bold red]❌ Fatal error: {e}[/bold red]")
         sys.exit(1)
@@ -1,20 +1,48 @@
+import atexit
+import hashlib
+import re
 import time
 import random
 import json
 import logging
 import asyncio
 import platform
+import threading
 import requests
+import numpy as np
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, urlparse
 
 from crewai import Agent
 from groq import Groq
 from dotenv import load_dotenv
 import os
 
+# Try to import orjson (optional - 2-5x faster JSON on large Serper payloads)
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _json_loads(data):
+        return json.loads(data)
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+# Try to import httpx (optional - HTTP/2 for Serper; needs httpx[http2])
+try:
+    import httpx
+    _HTTPX_CLIENT = httpx.Client(http2=True, timeout=30)
+except Exception:
+    _HTTPX_CLIENT = None
+
 # Try to import Playwright (optional - only works locally)
 try:
     from playwright.async_api import async_playwright
@@ -39,6 +67,281 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared keep-alive session for Serper: the concurrent queries reuse
+# pooled TCP+TLS connections instead of paying a handshake per request.
+_SESSION = requests.Session()
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# Known Pakistani e-commerce domains: membership is one hash lookup on
+# the parsed netloc instead of ten substring scans per result.
+_PK_DOMAINS = frozenset({
+    'daraz.pk', 'priceoye.pk', 'olx.com.pk', 'telemart.pk',
+    'shophive.pk', 'homeshopping.pk', 'symbios.pk', 'goto.com.pk',
+    'yayvo.com', 'mega.pk'
+})
+
+# Reports directory and filename sanitizer, resolved once per process
+# (the mkdir syscall runs on first save, not on every report).
+_REPORTS_DIR = Path("data/reports")
+_FILENAME_SAFE_RE = re.compile(r'[^A-Za-z0-9 _-]')
+_reports_dir_ready = False
+
+# Clean display names for the domains we recognise.
+_DOMAIN_MAP = {
+    'priceoye.pk': 'PriceOye',
+    'olx.com.pk': 'OLX Pakistan',
+    'telemart.pk': 'Telemart',
+    'shophive.pk': 'Shophive'
+}
+
+# Hot-path regexes compiled once at import: these run per scraped field /
+# per search result, so skip re's per-call cache lookup.
+_RS_PRICE_RE = re.compile(r'Rs[\s\.]*([0-9,]+)')
+_PRICE_NUM_RE = re.compile(r'[\d,]+')
+_RATING_RE = re.compile(r'(\d\.?\d?)')
+# Single alternation covering every supported price format (Rs. 50,000,
+# PKR 50,000, 50,000 PKR, Price: Rs. 50,000, ₨ 50,000): one scan per
+# string instead of one per pattern, with no backtracking-prone nesting.
+_PRICE_RE = re.compile(
+    r'(?:Price:\s*)?(?:Rs\.?|PKR\.?|₨)\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'
+    r'|(\d+(?:,\d{3})*)\s*(?:Rs|PKR)',
+    re.IGNORECASE,
+)
+
+
+def extract_price_pkr(text: str) -> Optional[int]:
+    """Extract the first PKR amount from free text, or None if absent."""
+    for match in _PRICE_RE.finditer(text):
+        amount = match.group(1) or match.group(2)
+        try:
+            return int(float(amount.replace(',', '')))
+        except ValueError:
+            continue
+    return None
+
+# Electronics categories with realistic PKR price ranges, used to reject
+# junk prices pulled from search snippets.
+_PRICE_RANGES = {
+    # Smartphones
+    'iphone': (50000, 500000),
+    'samsung': (15000, 400000),
+    'xiaomi': (15000, 150000),
+    'redmi': (15000, 100000),
+    'oppo': (15000, 150000),
+    'vivo': (15000, 150000),
+    'realme': (15000, 100000),
+    'oneplus': (40000, 200000),
+    'huawei': (20000, 200000),
+    'phone': (10000, 500000),
+    'mobile': (10000, 500000),
+
+    # Laptops
+    'laptop': (30000, 1000000),
+    'macbook': (150000, 1000000),
+    'dell': (30000, 500000),
+    'hp': (30000, 500000),
+    'lenovo': (30000, 500000),
+    'asus': (30000, 500000),
+
+    # Tablets
+    'ipad': (50000, 500000),
+    'tablet': (15000, 300000),
+
+    # Watches
+    'watch': (2000, 500000),
+    'apple watch': (50000, 300000),
+
+    # Audio
+    'airpods': (5000, 100000),
+    'earbuds': (1000, 100000),
+    'headphones': (1000, 100000),
+    'speaker': (2000, 200000),
+
+    # Gaming
+    'playstation': (50000, 300000),
+    'ps5': (100000, 300000),
+    'ps4': (30000, 150000),
+    'xbox': (50000, 300000),
+
+    # Accessories
+    'charger': (500, 20000),
+    'cable': (200, 10000),
+    'case': (300, 20000),
+    'cover': (300, 20000),
+    'protector': (200, 5000),
+}
+
+# Global plausibility bounds derived from the ranges above (the default
+# range tops out at 1,000,000): prices outside them fail for every
+# category, so validation can bail before the regex scan.
+_GLOBAL_MIN_PRICE = min(lo for lo, _ in _PRICE_RANGES.values())
+_GLOBAL_MAX_PRICE = max(1000000, *(hi for _, hi in _PRICE_RANGES.values()))
+
+# Single alternation that finds a category in one pass over the title;
+# longest keywords first so e.g. "apple watch" matches before "watch".
+_CAT_PATTERN = re.compile(
+    r'\b(' + '|'.join(re.escape(k) for k in sorted(_PRICE_RANGES, key=len, reverse=True)) + r')\b'
+)
+
+# Resource types aborted during Daraz scrapes - only text is extracted,
+# so none of these affect the data we read.
+_BLOCKED_RESOURCE_TYPES = {
+    "image", "font", "stylesheet", "media",
+    "beacon", "csp_report", "imageset", "texttrack",
+}
+
+# Third-party analytics/ad hosts blocked by URL substring - they never
+# carry product data and their beacons keep connections busy.
+_BLOCKED_URL_PARTS = ("googletagmanager", "google-analytics", "doubleclick", "facebook")
+
+
+def _should_block_route(route) -> bool:
+    request = route.request
+    return (
+        request.resource_type in _BLOCKED_RESOURCE_TYPES
+        or any(part in request.url for part in _BLOCKED_URL_PARTS)
+    )
+
+# Harvest every candidate product link in one in-page pass. Titled links
+# are preferred (matching the old selector priority); the untitled union
+# is the fallback.
+_PRODUCT_LINKS_SELECTOR = 'a[href*="/products/"]'
+_PRODUCT_LINKS_JS = """els => {
+    const links = els.map(a => ({
+        href: a.getAttribute('href'),
+        title: a.getAttribute('title') || a.innerText,
+        titled: a.hasAttribute('title')
+    }));
+    const titled = links.filter(l => l.titled);
+    return titled.length ? titled : links;
+}"""
+
+# All PDP field selectors resolved in a single in-page pass: one
+# page.evaluate replaces ~20 query_selector/inner_text round-trips over
+# Playwright's transport (each one is a cross-process hop).
+_PDP_EXTRACT_JS = """() => {
+    const sels = {
+        title: [
+            '[data-testid="pdp-product-title"]',
+            'h1[data-testid="pdp-product-title"]',
+            '.pdp-product-title',
+            'h1.pdp-mod-product-badge-title',
+            'h1'
+        ],
+        price: [
+            '[data-testid="pdp-price"] .currency',
+            '.pdp-price .currency',
+            '.pdp-product-price .currency',
+            '.price-current',
+            '[class*="price"]:not([class*="original"]):not([class*="discount"])'
+        ],
+        seller: [
+            '[data-testid="seller-name"] a',
+            '.seller-name a',
+            '.pdp-seller-name a',
+            '[class*="seller"] a',
+            '.seller-link'
+        ],
+        rating: [
+            '[data-testid="pdp-review-summary"] .score',
+            '.review-summary .score',
+            '.pdp-review .score',
+            '[class*="rating"] .score',
+            '.rating-average'
+        ]
+    };
+    const out = {};
+    for (const key in sels) {
+        for (const sel of sels[key]) {
+            let el = null;
+            try { el = document.querySelector(sel); } catch (e) { continue; }
+            if (el && el.innerText && el.innerText.trim()) {
+                out[key] = el.innerText.trim();
+                break;
+            }
+        }
+    }
+    return out;
+}"""
+
+# Long-lived Playwright state: launching Chromium costs seconds per query,
+# so a single browser is launched on a dedicated event-loop thread and
+# shared across scrapes. Each scrape opens (and closes) only a fresh
+# BrowserContext; the browser itself lives until process exit.
+_pw_loop = None
+_pw_loop_lock = threading.Lock()
+_playwright = None
+_browser = None
+_browser_lock = None  # asyncio.Lock, created lazily on the pool loop
+_context_sem = None  # asyncio.Semaphore bounding live contexts, created lazily
+
+# Each BrowserContext costs tens of MB of renderer memory; cap how many
+# exist at once so a burst of queries queues instead of ballooning RSS.
+MAX_BROWSER_CONTEXTS = int(os.getenv("PAKMA_MAX_CONTEXTS", "4"))
+
+
+def _get_pw_loop():
+    """Get the event loop that owns the shared browser, starting it on first use."""
+    global _pw_loop
+    with _pw_loop_lock:
+        if _pw_loop is None:
+            _pw_loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=_pw_loop.run_forever, name="playwright-pool", daemon=True
+            )
+            thread.start()
+            atexit.register(_shutdown_browser)
+    return _pw_loop
+
+
+def _get_context_sem() -> asyncio.Semaphore:
+    """Lazily create the context-count semaphore on the pool loop."""
+    global _context_sem
+    if _context_sem is None:
+        _context_sem = asyncio.Semaphore(MAX_BROWSER_CONTEXTS)
+    return _context_sem
+
+
+async def get_browser(headless: bool = True):
+    """Lazily start Playwright and launch the shared browser."""
+    global _playwright, _browser, _browser_lock
+    if _browser_lock is None:
+        _browser_lock = asyncio.Lock()
+    async with _browser_lock:
+        if _browser is None or not _browser.is_connected():
+            _playwright = await async_playwright().start()
+            _browser = await _playwright.chromium.launch(
+                # headless is fixed at first launch; later calls reuse it.
+                headless=headless,
+                args=[
+                    '--disable-blink-features=AutomationControlled',
+                    '--disable-dev-shm-usage',
+                    '--no-sandbox'
+                ]
+            )
+            logger.info("🌐 Shared Playwright browser launched")
+    return _browser
+
+
+def _shutdown_browser():
+    """Close the shared browser and stop Playwright at process exit."""
+    loop = _pw_loop
+    if loop is None or not loop.is_running():
+        return
+
+    async def _close():
+        if _browser is not None and _browser.is_connected():
+            await _browser.close()
+        if _playwright is not None:
+            await _playwright.stop()
+
+    try:
+        asyncio.run_coroutine_threadsafe(_close(), loop).result(timeout=10)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+
+
 # Get API keys from environment or Streamlit secrets
 def get_api_key(key_name):
     """Get API key from environment or Streamlit secrets"""
@@ -71,31 +374,186 @@ def get_groq_client():
     return groq_client
 
 
+class _TokenBucket:
+    """
+    Congestion-aware token bucket (adaptive token bucket, ATB/AATB style).
+
+    Callers block in acquire() until a token is available instead of
+    blind-sleeping into the quota. A 429 halves the effective refill rate
+    for a cooldown window; a run of successes restores it.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.penalty_until = 0.0
+        self.successes = 0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until the requested tokens are available, then take them."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, cooldown: float = 30.0):
+        """Halve the effective rate after a 429 (congestion signal)."""
+        with self._lock:
+            self.rate = max(self.base_rate / 8, self.rate / 2)
+            self.penalty_until = time.monotonic() + cooldown
+            self.successes = 0
+
+    def reward(self):
+        """Restore rate after a window of successes past the cooldown."""
+        with self._lock:
+            if self.rate < self.base_rate:
+                self.successes += 1
+                if self.successes >= 10 and time.monotonic() >= self.penalty_until:
+                    self.rate = min(self.base_rate, self.rate * 2)
+                    self.successes = 0
+
+
+class _TTLCache:
+    """
+    Minimal thread-safe TTL cache; small enough that it is not worth
+    pulling in cachetools for.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                # Evict the entry closest to expiry to stay bounded.
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+
+# Streamlit reruns often repeat the same query within minutes; serving
+# those from memory skips the whole Serper round-trip (and its billing).
+_SERPER_CACHE = _TTLCache(maxsize=512, ttl=600)
+
+# Full Groq reports keyed by the set of product URLs analysed: wording
+# variants of a query ("redmi note 14" vs "redmi note 14 price") resolve
+# to the same products and reuse the same report for a day.
+_REPORT_CACHE = _TTLCache(maxsize=128, ttl=86400)
+
+
+# CONTRACT: keep this byte-identical across calls. Groq prefix-caches
+# identical leading tokens, so a stable system message earns cached-token
+# pricing and faster first tokens on every report after the first. All
+# variable content (query, product table) belongs in the user message -
+# prefix matching stops at the first differing byte.
+_REPORT_SYSTEM_PROMPT = """You are an expert Pakistani e-commerce analyst. Create a comprehensive comparison report that helps consumers make informed purchasing decisions.
+
+Your report should include:
+1. Executive Summary
+2. Price Comparison (lowest to highest)
+3. Platform Analysis (reliability, reputation)
+4. Best Value Recommendations
+5. Market Insights specific to Pakistan
+6. Buying Recommendations
+
+Focus on Pakistani market conditions, local seller reliability, and consumer preferences.
+Use Pakistani Rupees (PKR) for all price discussions.
+Consider factors like:
+- PTA approval (for electronics)
+- Local warranty vs international warranty
+- Shipping costs and delivery time in Pakistan
+- Payment methods available in Pakistan
+
+Return structured analysis as plain text (not JSON) formatted for markdown."""
+
+
+# Sized to Groq's per-minute request quota (override via GROQ_RPM).
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+_GROQ_BUCKET = _TokenBucket(rate=GROQ_RPM / 60.0, capacity=GROQ_RPM)
+
+# At most GROQ_CONCURRENCY calls in flight at once; extra callers queue
+# here instead of racing the bucket and burning 429 round-trips.
+_GROQ_SEM = threading.Semaphore(int(os.getenv("GROQ_CONCURRENCY", "4")))
+
+# Serper allows ~10 QPS; the bucket paces concurrent sessions to the
+# real limit instead of a fixed inter-query sleep.
+_SERPER_BUCKET = _TokenBucket(rate=10.0, capacity=10.0)
+
+
 def groq_api_call_with_retry(client: Groq, messages: List[Dict], model: str = "llama-3.1-8b-instant", max_retries: int = 5, base_delay: float = 1.0):
     """
-    MANDATORY: Implement exponential backoff with jitter for Groq API rate limits
+    MANDATORY: Rate-limit Groq calls through the shared adaptive token
+    bucket, with backoff on 429s
     """
     for attempt in range(max_retries):
+        _GROQ_BUCKET.acquire()
         try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=0.1,
-                max_tokens=4000
-            )
+            with _GROQ_SEM:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=0.1,
+                    max_tokens=4000
+                )
+            _GROQ_BUCKET.reward()
+            # Surface the prefix-cache hit ratio so regressions (a byte
+            # changed above the user message) show up in the logs.
+            usage = getattr(response, "usage", None)
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = getattr(details, "cached_tokens", 0) or 0
+            if usage is not None and usage.prompt_tokens:
+                logger.info(f"Groq prompt cache: {cached}/{usage.prompt_tokens} prompt tokens cached")
             return response.choices[0].message.content
         except Exception as e:
             error_str = str(e).lower()
             if "rate_limit" in error_str or "429" in error_str or "too many requests" in error_str:
+                _GROQ_BUCKET.penalize()
                 if attempt == max_retries - 1:
                     raise e
-                delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+                # AWS-style full jitter, capped at 30s.
+                delay = random.uniform(0, min(30.0, base_delay * (2 ** attempt)))
+                # Prefer the server's own hint over the blind estimate.
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                if headers:
+                    retry_after = headers.get("retry-after") or headers.get("x-ratelimit-reset")
+                    if retry_after:
+                        try:
+                            delay = max(delay, float(retry_after))
+                        except ValueError:
+                            pass
                 logger.warning(f"Rate limit hit, retrying in {delay:.2f}s (attempt {attempt + 1})")
                 time.sleep(delay)
                 continue
             else:
                 raise e
-    
+
     return None
 
 
@@ -110,6 +568,201 @@ def handle_agent_errors(func):
     return wrapper
 
 
+# Hot-path result processing lives at module level: the Agent subclasses
+# go through Pydantic's descriptor machinery on every self.* access, so
+# the per-result loop calls these plain functions instead.
+
+def _extract_domain(url: str) -> str:
+    """Extract domain from URL"""
+    try:
+        domain = urlparse(url).netloc.lower()
+        domain = domain.replace('www.', '')
+        return _DOMAIN_MAP.get(domain, domain)
+    except:
+        return "unknown"
+
+
+def _is_valid_price_for_product(title: str, price: int) -> bool:
+    """
+    Validate price based on product category to filter out unrealistic prices
+    """
+    # Cheap numeric reject before any string work: no category accepts
+    # a price outside the global bounds.
+    if not _GLOBAL_MIN_PRICE <= price <= _GLOBAL_MAX_PRICE:
+        logger.info(f"🚫 Rejected unrealistic price {price} for '{title}'")
+        return False
+
+    title_lower = title.lower()
+
+    # One linear regex scan over the title instead of ~40 substring
+    # searches; longest-first alternation means "apple watch" wins
+    # over "watch".
+    match = _CAT_PATTERN.search(title_lower)
+    if match:
+        min_price, max_price = _PRICE_RANGES[match.group(1)]
+        if min_price <= price <= max_price:
+            return True
+        logger.info(f"🚫 Rejected price {price} for '{title}' (expected {min_price}-{max_price})")
+        return False
+
+    # Default range for unknown products
+    if 1000 <= price <= 1000000:
+        return True
+
+    logger.info(f"🚫 Rejected unrealistic price {price} for '{title}'")
+    return False
+
+
+def _format_products_for_prompt(products: List[dict]) -> str:
+    """
+    Compact tab-separated product table for the Groq prompt: one line per
+    product instead of a six-line block, which cuts the user-prompt token
+    count (cost and time-to-first-token) without losing any field.
+    """
+    lines = ["platform\ttitle\tprice\tprice_numeric\turl\tconfidence"]
+    for p in products:
+        lines.append(
+            f"{p.get('platform', 'Unknown')}\t{p.get('title', 'Unknown')}\t"
+            f"{p.get('price_text', 'N/A')}\t{p.get('price_numeric', 'N/A')}\t"
+            f"{p.get('url', 'N/A')}\t{p.get('confidence', 0)}"
+        )
+    return "\n".join(lines)
+
+
+def _summarize_prices(products: List[dict]) -> dict:
+    """
+    Single vectorized pass over the numeric prices. Returns {} when no
+    product carries a price; otherwise the cheapest / most expensive
+    product dicts plus min/max/avg/count.
+    """
+    priced = [p for p in products if p.get('price_numeric')]
+    if not priced:
+        return {}
+    prices = np.fromiter(
+        (p['price_numeric'] for p in priced), dtype=np.float64, count=len(priced)
+    )
+    i_min = int(prices.argmin())
+    i_max = int(prices.argmax())
+    return {
+        'cheapest': priced[i_min],
+        'most_expensive': priced[i_max],
+        'min': priced[i_min]['price_numeric'],
+        'max': priced[i_max]['price_numeric'],
+        'avg': float(prices.mean()),
+        'count': len(priced),
+    }
+
+
+def _ingest_organic_results(organic_results, unique_results, seen_urls) -> int:
+    """
+    Filter, process and dedupe one batch of Serper organic results into
+    unique_results, returning how many were added. The whole batch runs
+    in one tight loop with the hot names bound to locals, so per-item
+    cost is a handful of local lookups rather than repeated global and
+    attribute resolution.
+    """
+    pk_domains = _PK_DOMAINS
+    fingerprint = _url_fingerprint
+    process = _process_search_result
+    parse = urlparse
+    seen_add = seen_urls.add
+    append = unique_results.append
+    added = 0
+    for result in organic_results:
+        link = result.get('link', '')
+
+        # Keep results from Pakistani domains OR mentioning Pakistan
+        netloc = parse(link).netloc.lower().removeprefix('www.')
+        if not (netloc in pk_domains or netloc.endswith('.pk')
+                or 'pakistan' in result.get('snippet', '').lower()
+                or 'pakistan' in result.get('title', '').lower()):
+            continue
+
+        processed = process(result)
+        url = processed.get('url') if processed else None
+        if not url:
+            continue
+        fp = fingerprint(url)
+        if fp in seen_urls:
+            continue
+        seen_add(fp)
+        append(processed)
+        added += 1
+    return added
+
+
+# Exact-name tracking parameters stripped from fingerprints; utm_* is
+# matched by prefix.
+_TRACKING_PARAMS = frozenset({'fbclid', 'gclid'})
+
+
+def _url_fingerprint(url: str) -> bytes:
+    """
+    8-byte fingerprint of a normalized URL. Only tracking parameters
+    (utm_*, fbclid, gclid) are stripped so shared-link variants collapse
+    to one entry; the rest of the query string is kept - sorted - because
+    some storefronts identify products by it (item.php?id=N, ?sku=...).
+    The dedupe set stores 8 bytes per URL instead of 200+ character
+    strings.
+    """
+    parts = urlparse(url)
+    normalized = f"{parts.netloc.lower().removeprefix('www.')}{parts.path}"
+    if parts.query:
+        kept = sorted(
+            pair for pair in parts.query.split('&')
+            if not (pair.startswith('utm_')
+                    or pair.partition('=')[0] in _TRACKING_PARAMS)
+        )
+        if kept:
+            normalized += '?' + '&'.join(kept)
+    return hashlib.blake2b(normalized.encode(), digest_size=8).digest()
+
+
+def _process_search_result(result: dict) -> Optional[dict]:
+    """
+    DIRECT PROCESSING: Process individual search result without Agent C
+    """
+    try:
+        title = result.get('title', 'Unknown Product')
+        link = result.get('link', '')
+        snippet = result.get('snippet', '')
+
+        price_numeric = None
+        price_text = "Price not available"
+
+        # Extract price candidates in a single scan of title + snippet
+        text_to_search = f"{title} {snippet}"
+        for match in _PRICE_RE.finditer(text_to_search):
+            try:
+                price_str = (match.group(1) or match.group(2)).replace(',', '').replace('.00', '')
+                candidate = int(float(price_str))
+            except:
+                continue
+
+            # Smart price validation based on product category
+            if _is_valid_price_for_product(title, candidate):
+                price_numeric = candidate
+                price_text = f"Rs. {price_numeric:,}"
+                break
+
+        return {
+            "title": title,
+            "price_text": price_text,
+            "price_numeric": price_numeric,
+            "currency": "PKR",
+            "platform": _extract_domain(link),
+            "url": link,
+            "availability": "unknown",
+            "seller": "unknown",
+            "specifications": [],
+            "confidence": 0.8 if price_numeric else 0.5
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing result: {e}")
+        return None
+
+
 class AgentA_DarazScraper(Agent):
     """
     Agent A: Daraz Scraping Agent
@@ -135,27 +788,30 @@ class AgentA_DarazScraper(Agent):
         Synchronous wrapper for scrape_daraz_product
         """
         try:
-            if platform.system() == "Windows":
-                # Ensure proper event loop for Windows
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_closed():
-                        raise RuntimeError("Event loop is closed")
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                return loop.run_until_complete(
-                    self.scrape_daraz_product(query, index, headless, timeout, max_products)
-                )
-            else:
-                return asyncio.run(
-                    self.scrape_daraz_product(query, index, headless, timeout, max_products)
-                )
+            # Run on the pool's dedicated loop so the shared browser
+            # survives across calls (asyncio.run would tear down the loop
+            # the browser is bound to).
+            future = asyncio.run_coroutine_threadsafe(
+                self.scrape_daraz_product(query, index, headless, timeout, max_products),
+                _get_pw_loop()
+            )
+            return future.result()
         except Exception as e:
             logger.error(f"❌ Sync wrapper error: {e}")
             return {"error": str(e), "status": "failed"}
 
+    async def scrape_daraz_async(self, query: str, index: int = 0, headless: bool = False,
+                                 timeout: int = 60000, max_products: int = 1) -> dict:
+        """
+        Awaitable wrapper usable from any event loop, so callers can run
+        the Daraz scrape concurrently with other agents via asyncio.gather
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.scrape_daraz_product(query, index, headless, timeout, max_products),
+            _get_pw_loop()
+        )
+        return await asyncio.wrap_future(future)
+
     @handle_agent_errors
     async def scrape_daraz_product(self, query: str, index: int = 0, headless: bool = True, 
                                  timeout: int = 120000, max_products: int = 1) -> dict:
@@ -166,221 +822,199 @@ class AgentA_DarazScraper(Agent):
             logger.info("ℹ️ Playwright not available - skipping Daraz scraping (Daraz results available via Serper)")
             return {"error": "Playwright not installed", "status": "skipped"}
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=headless,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox'
-                ]
-            )
+        browser = await get_browser(headless=headless)
+        sem = _get_context_sem()
+        await sem.acquire()
+        context = None
+        try:
             context = await browser.new_context(
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 viewport={'width': 1920, 'height': 1080},
                 extra_http_headers={
                     'Accept-Language': 'en-US,en;q=0.9',
                     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-                }
+                },
+                service_workers='block'
+            )
+            # We only read text fields, so skip the heavy page weight: images,
+            # fonts, stylesheets, media, beacons and third-party analytics
+            # make up most of a Daraz page load.
+            await context.route(
+                "**/*",
+                lambda route: route.abort()
+                if _should_block_route(route)
+                else route.continue_()
             )
             page = await context.new_page()
             page.set_default_timeout(timeout)
+
+            # Daraz search pages hydrate from a JSON XHR that already
+            # carries title/price/url per item; capturing it skips the
+            # DOM-render wait. DOM scraping below remains the fallback.
+            search_json: asyncio.Future = asyncio.get_running_loop().create_future()
+
+            async def _capture_search_json(response):
+                if search_json.done():
+                    return
+                url = response.url
+                if 'daraz.pk/catalog' not in url or 'ajax=true' not in url:
+                    return
+                try:
+                    payload = await response.json()
+                    items = payload.get('mods', {}).get('listItems') or []
+                    if items:
+                        search_json.set_result(items)
+                except Exception:
+                    pass
+
+            page.on('response', _capture_search_json)
+
+            # Navigate to search page
+            encoded_query = quote_plus(query)
+            search_url = f"https://www.daraz.pk/catalog/?q={encoded_query}"
             
-            try:
-                # Navigate to search page
-                encoded_query = quote_plus(query)
-                search_url = f"https://www.daraz.pk/catalog/?q={encoded_query}"
-                
-                logger.info(f"🔍 Agent A: Searching Daraz for: {query}")
-                logger.info(f"📍 URL: {search_url}")
-                
-                # Try multiple times with different strategies
-                loaded = False
-                for attempt in range(3):
-                    try:
-                        if attempt == 0:
-                            await page.goto(search_url, wait_until='domcontentloaded', timeout=60000)
-                        elif attempt == 1:
-                            await page.goto(search_url, wait_until='load', timeout=70000)
-                        else:
-                            await page.goto(search_url, timeout=80000)
-                        loaded = True
-                        break
-                    except Exception as e:
-                        logger.warning(f"Attempt {attempt + 1} failed: {str(e)[:100]}")
-                        if attempt < 2:
-                            await page.wait_for_timeout(3000)
-                            continue
-                        else:
-                            raise e
-                
-                if not loaded:
-                    raise Exception("Failed to load Daraz after 3 attempts")
-                
-                # Find product links
-                await page.wait_for_selector('a[href*="/products/"]', timeout=20000)
-                
-                selectors = [
-                    'a[href*="/products/"][title]',
-                    'a[title][href^="//www.daraz.pk/products/"]',
-                    'a[href*="/products/"]'
-                ]
-                
-                product_links = []
-                for selector in selectors:
-                    elements = await page.query_selector_all(selector)
-                    for element in elements:
-                        href = await element.get_attribute('href')
-                        title = await element.get_attribute('title') or await element.inner_text()
-                        if href and title.strip():
-                            product_links.append({'href': href, 'title': title.strip()})
-                    
-                    if product_links:
-                        break
-                
-                if not product_links:
-                    return {"error": "No products found", "status": "failed"}
-                
-                # Select product
-                if index >= len(product_links):
-                    index = 0
-                
-                selected_product = product_links[index]
-                product_url = selected_product['href']
-                
-                if not product_url.startswith('http'):
-                    product_url = f"https:{product_url}" if product_url.startswith('//') else f"https://www.daraz.pk{product_url}"
-                
-                logger.info(f"🎯 Agent A: Scraping: {selected_product['title'][:50]}...")
-                
-                # Navigate to product page
-                await page.goto(product_url, wait_until='domcontentloaded')
-                await page.wait_for_timeout(2000)  # Wait 2s for dynamic content
-                
-                # Extract product data with better filtering
-                product_data = {
-                    'url': product_url,
-                    'title': selected_product['title']
-                }
-                
-                # Extract clean title from page (sometimes better than link title)
-                title_selectors = [
-                    '[data-testid="pdp-product-title"]',
-                    'h1[data-testid="pdp-product-title"]',
-                    '.pdp-product-title',
-                    'h1.pdp-mod-product-badge-title',
-                    'h1'
-                ]
-                
-                for selector in title_selectors:
-                    try:
-                        title_element = await page.query_selector(selector)
-                        if title_element:
-                            clean_title = await title_element.inner_text()
-                            if clean_title and len(clean_title.strip()) > 10:
-                                product_data['title'] = clean_title.strip()
-                                break
-                    except:
-                        continue
-                
-                # Extract price - focus on main price only
-                price_selectors = [
-                    '[data-testid="pdp-price"] .currency',
-                    '.pdp-price .currency',
-                    '.pdp-product-price .currency',
-                    '.price-current',
-                    '[class*="price"]:not([class*="original"]):not([class*="discount"])'
-                ]
-                
-                price_text = None
-                for selector in price_selectors:
-                    try:
-                        price_element = await page.query_selector(selector)
-                        if price_element:
-                            price_text = await price_element.inner_text()
-                            # Clean price text - remove extra info
-                            if price_text and 'Rs' in price_text:
-                                # Extract just the price part
-                                import re
-                                price_match = re.search(r'Rs[\s\.]*([0-9,]+)', price_text)
-                                if price_match:
-                                    price_text = f"Rs. {price_match.group(1)}"
-                                break
-                    except:
+            logger.info(f"🔍 Agent A: Searching Daraz for: {query}")
+            logger.info(f"📍 URL: {search_url}")
+            
+            # Try multiple times with different strategies
+            loaded = False
+            for attempt in range(3):
+                try:
+                    if attempt == 0:
+                        await page.goto(search_url, wait_until='domcontentloaded', timeout=60000)
+                    elif attempt == 1:
+                        await page.goto(search_url, wait_until='load', timeout=70000)
+                    else:
+                        await page.goto(search_url, timeout=80000)
+                    loaded = True
+                    break
+                except Exception as e:
+                    logger.warning(f"Attempt {attempt + 1} failed: {str(e)[:100]}")
+                    if attempt < 2:
+                        await page.wait_for_timeout(3000)
                         continue
-                
-                if price_text:
-                    product_data['price_text'] = price_text.strip()
-                    # Extract numeric price (PKR)
-                    import re
-                    price_numbers = re.findall(r'[\d,]+', price_text)
-                    if price_numbers:
-                        try:
-                            price_numeric = int(price_numbers[0].replace(',', ''))
-                            product_data['price_pkr'] = price_numeric
-                        except:
-                            pass
-                
-                # Extract seller - focus on main seller name only
-                seller_selectors = [
-                    '[data-testid="seller-name"] a',
-                    '.seller-name a', 
-                    '.pdp-seller-name a',
-                    '[class*="seller"] a',
-                    '.seller-link'
+                    else:
+                        raise e
+            
+            if not loaded:
+                raise Exception("Failed to load Daraz after 3 attempts")
+            
+            # Prefer the intercepted search JSON if it landed; give it a
+            # few seconds since it usually arrives with the initial load.
+            product_links = []
+            try:
+                items = await asyncio.wait_for(asyncio.shield(search_json), timeout=5)
+                product_links = [
+                    {'href': item.get('productUrl') or item.get('itemUrl') or '',
+                     'title': (item.get('name') or '').strip()}
+                    for item in items
                 ]
-                
-                seller_name = None
-                for selector in seller_selectors:
-                    try:
-                        seller_element = await page.query_selector(selector)
-                        if seller_element:
-                            seller_text = await seller_element.inner_text()
-                            # Clean seller name - avoid extra info
-                            if seller_text and not any(word in seller_text.lower() for word in ['chat', 'store', 'rating', 'response', '%']):
-                                seller_name = seller_text.strip()
-                                break
-                    except:
-                        continue
-                
-                if seller_name:
-                    product_data['seller'] = seller_name
-                
-                # Extract rating - focus on numerical rating only
-                rating_selectors = [
-                    '[data-testid="pdp-review-summary"] .score',
-                    '.review-summary .score',
-                    '.pdp-review .score',
-                    '[class*="rating"] .score',
-                    '.rating-average'
+                product_links = [l for l in product_links if l['href'] and l['title']]
+                if product_links:
+                    logger.info(f"📦 Agent A: {len(product_links)} products from intercepted search JSON")
+            except Exception:
+                pass
+
+            if not product_links:
+                # DOM fallback: wait until any candidate product link
+                # exists, then extract them all in one shot.
+                await page.wait_for_selector(
+                    'a[href*="/products/"][title], '
+                    'a[title][href^="//www.daraz.pk/products/"], '
+                    'a[href*="/products/"]',
+                    timeout=20000
+                )
+
+                # One evaluate returns every candidate link; the old version
+                # paid two transport round-trips per element.
+                raw_links = await page.eval_on_selector_all(
+                    _PRODUCT_LINKS_SELECTOR, _PRODUCT_LINKS_JS
+                )
+                product_links = [
+                    {'href': link['href'], 'title': link['title'].strip()}
+                    for link in raw_links
+                    if link['href'] and link['title'] and link['title'].strip()
                 ]
-                
-                for selector in rating_selectors:
+
+            if not product_links:
+                return {"error": "No products found", "status": "failed"}
+            
+            # Select product
+            if index >= len(product_links):
+                index = 0
+            
+            selected_product = product_links[index]
+            product_url = selected_product['href']
+            
+            if not product_url.startswith('http'):
+                product_url = f"https:{product_url}" if product_url.startswith('//') else f"https://www.daraz.pk{product_url}"
+            
+            logger.info(f"🎯 Agent A: Scraping: {selected_product['title'][:50]}...")
+            
+            # Navigate to product page
+            await page.goto(product_url, wait_until='domcontentloaded')
+            await page.wait_for_timeout(2000)  # Wait 2s for dynamic content
+            
+            # Extract product data with better filtering
+            product_data = {
+                'url': product_url,
+                'title': selected_product['title']
+            }
+            
+            # Pull title/price/seller/rating in one in-page pass, then
+            # clean the raw strings with the pre-compiled regexes here.
+            fields = await page.evaluate(_PDP_EXTRACT_JS)
+
+            # Clean title from page (sometimes better than link title)
+            clean_title = fields.get('title', '')
+            if len(clean_title) > 10:
+                product_data['title'] = clean_title
+
+            # Price - focus on main price only
+            price_text = fields.get('price')
+            if price_text:
+                if 'Rs' in price_text:
+                    price_match = _RS_PRICE_RE.search(price_text)
+                    if price_match:
+                        price_text = f"Rs. {price_match.group(1)}"
+                product_data['price_text'] = price_text.strip()
+                # Extract numeric price (PKR)
+                price_numbers = _PRICE_NUM_RE.findall(price_text)
+                if price_numbers:
                     try:
-                        rating_element = await page.query_selector(selector)
-                        if rating_element:
-                            rating_text = await rating_element.inner_text()
-                            # Extract only numerical rating
-                            import re
-                            rating_match = re.search(r'(\d\.?\d?)', rating_text)
-                            if rating_match:
-                                rating_value = float(rating_match.group(1))
-                                if 0 <= rating_value <= 5:  # Valid rating range
-                                    product_data['rating_average'] = rating_value
-                                    break
+                        price_numeric = int(price_numbers[0].replace(',', ''))
+                        product_data['price_pkr'] = price_numeric
                     except:
-                        continue
-                
-                await browser.close()
-                
-                logger.info("✅ Agent A: Daraz scraping completed successfully")
-                product_data['status'] = 'success'
-                return product_data
-                
-            except Exception as e:
-                await browser.close()
-                logger.error(f"❌ Agent A: Scraping failed: {e}")
-                return {"error": str(e), "status": "failed"}
+                        pass
+
+            # Seller - keep the main seller name, drop widget text
+            seller_text = fields.get('seller', '')
+            if seller_text and not any(word in seller_text.lower() for word in ['chat', 'store', 'rating', 'response', '%']):
+                product_data['seller'] = seller_text
+
+            # Rating - keep only a plausible numerical rating
+            rating_text = fields.get('rating', '')
+            rating_match = _RATING_RE.search(rating_text)
+            if rating_match:
+                try:
+                    rating_value = float(rating_match.group(1))
+                    if 0 <= rating_value <= 5:  # Valid rating range
+                        product_data['rating_average'] = rating_value
+                except ValueError:
+                    pass
+
+            logger.info("✅ Agent A: Daraz scraping completed successfully")
+            product_data['status'] = 'success'
+            return product_data
+
+        except Exception as e:
+            logger.error(f"❌ Agent A: Scraping failed: {e}")
+            return {"error": str(e), "status": "failed"}
+        finally:
+            # Close only the per-request context; the browser stays warm.
+            if context is not None:
+                await context.close()
+            sem.release()
 
 
 class AgentB_SerperSearch(Agent):
@@ -401,6 +1035,16 @@ class AgentB_SerperSearch(Agent):
             allow_delegation=False
         )
     
+    async def search_pakistani_async(self, product_name: str, max_results: int = 10) -> dict:
+        """
+        Awaitable wrapper so the sync Serper search composes with
+        asyncio.gather alongside Agent A's scrape
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self.search_pakistani_sites(product_name, max_results)
+        )
+
     @handle_agent_errors
     def search_pakistani_sites(self, product_name: str, max_results: int = 10) -> dict:
         """
@@ -408,7 +1052,14 @@ class AgentB_SerperSearch(Agent):
         Returns processed results directly (NO Agent C needed)
         """
         logger.info(f"🔍 Agent B: Searching Pakistani sites for: {product_name}")
-        
+
+        # Repeat lookups within the TTL skip the network entirely.
+        cache_key = (product_name.strip().lower(), max_results, 'pk')
+        cached = _SERPER_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Agent B: Serving cached results for: {product_name}")
+            return cached
+
         try:
             # Get API key when actually needed (lazy loading)
             api_key = get_api_key("SERPER_API_KEY")
@@ -442,83 +1093,71 @@ class AgentB_SerperSearch(Agent):
                 f"{product_name} Pakistan price comparison"
             ]
             
-            all_results = []
-            
-            for query in search_queries:
-                try:
-                    payload = {
-                        "q": query,
-                        "num": 10,  # Increased from 5 to 10 per query
-                        "hl": "en",
-                        "gl": "pk"  # Pakistan geo-location
-                    }
-                    
-                    logger.info(f"📡 Agent B: Serper query: {query[:50]}...")
-                    response = requests.post(
-                        f"{base_url}/search",
-                        headers=headers,
-                        json=payload,
-                        timeout=30
-                    )
-                    
-                    logger.info(f"📡 Agent B: Serper response status: {response.status_code}")
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        organic_results = data.get('organic', [])
-                        
-                        logger.info(f"📊 Agent B: Got {len(organic_results)} results for query")
-                        
-                        for result in organic_results:
-                            # Process ALL results, not just Pakistani e-commerce
-                            link = result.get('link', '')
-                            
-                            # Process if it's from Pakistani domains OR contains Pakistan-related keywords
-                            is_pakistani = any(site in link.lower() for site in [
-                                'daraz.pk', 'priceoye.pk', 'olx.com.pk', 'telemart.pk', 
-                                'shophive.pk', 'homeshopping.pk', 'symbios.pk', 'goto.com.pk',
-                                'yayvo.com', 'mega.pk'
-                            ])
-                            
-                            # Also check if Pakistan is mentioned
-                            snippet = result.get('snippet', '').lower()
-                            title = result.get('title', '').lower()
-                            has_pakistan = 'pakistan' in snippet or 'pakistan' in title or '.pk' in link
-                            
-                            if is_pakistani or has_pakistan:
-                                processed_product = self._process_search_result(result)
-                                if processed_product:
-                                    all_results.append(processed_product)
-                                    logger.info(f"✅ Agent B: Added result from {processed_product.get('platform', 'unknown')}")
-                    else:
-                        logger.error(f"❌ Agent B: Serper API returned status {response.status_code}: {response.text[:200]}")
-                    
-                    # Small delay between queries
-                    time.sleep(0.5)
-                
-                except Exception as e:
-                    logger.error(f"❌ Agent B: Query failed: {e}")
-                    continue
-        
-            # Remove duplicates
+            # Deduplicate by URL while ingesting rather than in a second
+            # pass, so only one list is held.
             unique_results = []
             seen_urls = set()
-            
-            for result in all_results:
-                url = result.get('url', '')
-                if url and url not in seen_urls:
-                    seen_urls.add(url)
-                    unique_results.append(result)
-            
+
+            # Serper's /search endpoint accepts a JSON array of query
+            # objects and returns one result object per query, so all the
+            # queries go out in a single HTTP request instead of eight.
+            payload = [
+                {
+                    "q": search_query,
+                    "num": 10,  # Increased from 5 to 10 per query
+                    "hl": "en",
+                    "gl": "pk"  # Pakistan geo-location
+                }
+                for search_query in search_queries
+            ]
+            logger.info(f"📡 Agent B: Serper batch request ({len(payload)} queries)")
+            _SERPER_BUCKET.acquire()
+            # Encode/decode through the fast JSON path; headers already
+            # carry Content-Type: application/json. Prefer the HTTP/2
+            # client when installed, otherwise the pooled HTTP/1.1 session.
+            if _HTTPX_CLIENT is not None:
+                response = _HTTPX_CLIENT.post(
+                    f"{base_url}/search",
+                    headers=headers,
+                    content=_json_dumps(payload)
+                )
+            else:
+                response = _SESSION.post(
+                    f"{base_url}/search",
+                    headers=headers,
+                    data=_json_dumps(payload),
+                    timeout=30
+                )
+
+            logger.info(f"📡 Agent B: Serper response status: {response.status_code}")
+
+            if response.status_code == 200:
+                batch = _json_loads(response.content)
+                if isinstance(batch, dict):
+                    # Single-query responses come back as one object
+                    batch = [batch]
+                for data in batch:
+                    organic_results = data.get('organic', [])
+
+                    logger.info(f"📊 Agent B: Got {len(organic_results)} results for query")
+
+                    added = _ingest_organic_results(organic_results, unique_results, seen_urls)
+                    if added:
+                        logger.info(f"✅ Agent B: Added {added} new results from this query")
+            else:
+                logger.error(f"❌ Agent B: Serper API returned status {response.status_code}: {response.text[:200]}")
+
             logger.info(f"✅ Agent B: Found {len(unique_results)} unique results from Pakistani sites")
             logger.info(f"📊 Agent B: {sum(1 for r in unique_results if r.get('price_numeric'))} results have prices")
             
-            return {
+            search_payload = {
                 "status": "success",
                 "results": unique_results,
                 "results_count": len(unique_results),
-                "raw_results": all_results  # Keep for debugging
+                "raw_results": unique_results  # Kept for downstream consumers
             }
+            _SERPER_CACHE.set(cache_key, search_payload)
+            return search_payload
             
         except Exception as e:
             logger.error(f"❌ Agent B: Critical error in search_pakistani_sites: {e}")
@@ -534,152 +1173,17 @@ class AgentB_SerperSearch(Agent):
         """
         DIRECT PROCESSING: Process individual search result without Agent C
         """
-        try:
-            title = result.get('title', 'Unknown Product')
-            link = result.get('link', '')
-            snippet = result.get('snippet', '')
-            
-            # Extract price from title or snippet using regex - MORE PATTERNS
-            import re
-            price_patterns = [
-                r'Rs\.?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)',  # Rs. 50,000 or Rs. 50,000.00
-                r'PKR\.?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)', # PKR 50,000
-                r'(\d+(?:,\d{3})*)\s*(?:Rs|PKR)',         # 50,000 Rs
-                r'Price:\s*Rs\.?\s*(\d+(?:,\d{3})*)',     # Price: Rs. 50,000
-                r'₨\s*(\d+(?:,\d{3})*)',                  # ₨ 50,000
-            ]
-            
-            price_numeric = None
-            price_text = "Price not available"
-            
-            text_to_search = f"{title} {snippet}"
-            for pattern in price_patterns:
-                match = re.search(pattern, text_to_search, re.IGNORECASE)
-                if match:
-                    try:
-                        price_str = match.group(1).replace(',', '').replace('.00', '')
-                        price_numeric = int(float(price_str))
-                        
-                        # Smart price validation based on product category
-                        if self._is_valid_price_for_product(title, price_numeric):
-                            price_text = f"Rs. {price_numeric:,}"
-                            break
-                        else:
-                            price_numeric = None
-                    except:
-                        continue
-            
-            # Determine platform
-            platform = self._extract_domain(link)
-            
-            return {
-                "title": title,
-                "price_text": price_text,
-                "price_numeric": price_numeric,
-                "currency": "PKR",
-                "platform": platform,
-                "url": link,
-                "availability": "unknown",
-                "seller": "unknown",
-                "specifications": [],
-                "confidence": 0.8 if price_numeric else 0.5
-            }
-            
-        except Exception as e:
-            logger.error(f"Error processing result: {e}")
-            return None
-    
+        return _process_search_result(result)
+
     def _is_valid_price_for_product(self, title: str, price: int) -> bool:
         """
         Validate price based on product category to filter out unrealistic prices
         """
-        title_lower = title.lower()
-        
-        # Electronics categories with realistic price ranges
-        price_ranges = {
-            # Smartphones
-            'iphone': (50000, 500000),
-            'samsung': (15000, 400000),
-            'xiaomi': (15000, 150000),
-            'redmi': (15000, 100000),
-            'oppo': (15000, 150000),
-            'vivo': (15000, 150000),
-            'realme': (15000, 100000),
-            'oneplus': (40000, 200000),
-            'huawei': (20000, 200000),
-            'phone': (10000, 500000),
-            'mobile': (10000, 500000),
-            
-            # Laptops
-            'laptop': (30000, 1000000),
-            'macbook': (150000, 1000000),
-            'dell': (30000, 500000),
-            'hp': (30000, 500000),
-            'lenovo': (30000, 500000),
-            'asus': (30000, 500000),
-            
-            # Tablets
-            'ipad': (50000, 500000),
-            'tablet': (15000, 300000),
-            
-            # Watches
-            'watch': (2000, 500000),
-            'apple watch': (50000, 300000),
-            
-            # Audio
-            'airpods': (5000, 100000),
-            'earbuds': (1000, 100000),
-            'headphones': (1000, 100000),
-            'speaker': (2000, 200000),
-            
-            # Gaming
-            'playstation': (50000, 300000),
-            'ps5': (100000, 300000),
-            'ps4': (30000, 150000),
-            'xbox': (50000, 300000),
-            
-            # Accessories
-            'charger': (500, 20000),
-            'cable': (200, 10000),
-            'case': (300, 20000),
-            'cover': (300, 20000),
-            'protector': (200, 5000),
-        }
-        
-        # Check which category matches
-        for keyword, (min_price, max_price) in price_ranges.items():
-            if keyword in title_lower:
-                if min_price <= price <= max_price:
-                    return True
-                else:
-                    logger.info(f"🚫 Rejected price {price} for '{title}' (expected {min_price}-{max_price})")
-                    return False
-        
-        # Default range for unknown products
-        if 1000 <= price <= 1000000:
-            return True
-        
-        logger.info(f"🚫 Rejected unrealistic price {price} for '{title}'")
-        return False
+        return _is_valid_price_for_product(title, price)
 
-    
     def _extract_domain(self, url: str) -> str:
         """Extract domain from URL"""
-        try:
-            from urllib.parse import urlparse
-            domain = urlparse(url).netloc.lower()
-            domain = domain.replace('www.', '')
-            
-            # Map to clean names
-            domain_map = {
-                'priceoye.pk': 'PriceOye',
-                'olx.com.pk': 'OLX Pakistan', 
-                'telemart.pk': 'Telemart',
-                'shophive.pk': 'Shophive'
-            }
-            return domain_map.get(domain, domain)
-        except:
-            return "unknown"
+        return _extract_domain(url)
 
 
 class AgentD_ReportGenerator(Agent):
@@ -736,40 +1240,42 @@ class AgentD_ReportGenerator(Agent):
                 "error": "No product data available for report generation",
                 "status": "failed"
             }
-        
+
+        # Same product set -> same report, regardless of query wording.
+        report_key = tuple(sorted(p.get('url', '') for p in all_products)) or query.strip().lower()
+        cached_report = _REPORT_CACHE.get(report_key)
+        if cached_report is not None:
+            logger.info(f"⚡ Agent D: Serving cached report for: {query}")
+            return cached_report
+
+        # One product is nothing to "compare": the deterministic fallback
+        # report is faster and more honest than an LLM comparison, so skip
+        # Groq entirely.
+        if len(all_products) < 2:
+            logger.info("ℹ️ Agent D: Single product - using direct report, skipping LLM")
+            basic_report = self._create_fallback_report(query, all_products)
+            report_file = self._save_report_to_file(query, basic_report, all_products)
+            report_payload = {
+                "status": "success",
+                "report": {
+                    "full_report": basic_report,
+                    "best_deals": self._extract_best_deals(all_products),
+                    "market_insights": self._extract_market_insights(all_products),
+                    "buying_recommendations": "See full report"
+                },
+                "report_file": report_file,
+                "products_analyzed": len(all_products)
+            }
+            _REPORT_CACHE.set(report_key, report_payload)
+            return report_payload
+
         # Generate report using Groq LLM
-        products_summary = "\n".join([
-            f"Platform: {p.get('platform', 'Unknown')}\n"
-            f"Title: {p.get('title', 'Unknown')}\n"
-            f"Price: {p.get('price_text', 'N/A')} (Numeric: {p.get('price_numeric', 'N/A')})\n"
-            f"URL: {p.get('url', 'N/A')}\n"
-            f"Confidence: {p.get('confidence', 0)}\n"
-            "---"
-            for p in all_products
-        ])
+        products_summary = _format_products_for_prompt(all_products)
         
         messages = [
             {
                 "role": "system",
-                "content": """You are an expert Pakistani e-commerce analyst. Create a comprehensive comparison report that helps consumers make informed purchasing decisions.
-
-Your report should include:
-1. Executive Summary
-2. Price Comparison (lowest to highest)
-3. Platform Analysis (reliability, reputation)
-4. Best Value Recommendations
-5. Market Insights specific to Pakistan
-6. Buying Recommendations
-
-Focus on Pakistani market conditions, local seller reliability, and consumer preferences.
-Use Pakistani Rupees (PKR) for all price discussions.
-Consider factors like:
-- PTA approval (for electronics)
-- Local warranty vs international warranty
-- Shipping costs and delivery time in Pakistan
-- Payment methods available in Pakistan
-
-Return structured analysis as plain text (not JSON) formatted for markdown."""
+                "content": _REPORT_SYSTEM_PROMPT
             },
             {
                 "role": "user",
@@ -803,12 +1309,14 @@ Generate detailed analysis focusing on Pakistani market conditions, local seller
                 report_file = self._save_report_to_file(query, response, all_products)
                 
                 logger.info(f"✅ Agent D: Report generated successfully")
-                return {
+                report_payload = {
                     "status": "success",
                     "report": report_data,
                     "report_file": report_file,
                     "products_analyzed": len(all_products)
                 }
+                _REPORT_CACHE.set(report_key, report_payload)
+                return report_payload
                 
             except Exception as parse_error:
                 logger.error(f"❌ Agent D: JSON parsing failed: {parse_error}")
@@ -849,13 +1357,13 @@ Generate detailed analysis focusing on Pakistani market conditions, local seller
     
     def _extract_best_deals(self, products: List[dict]) -> dict:
         """Extract best deals from product list"""
-        valid_prices = [p for p in products if p.get('price_numeric')]
-        if not valid_prices:
+        summary = _summarize_prices(products)
+        if not summary:
             return {}
-        
-        cheapest = min(valid_prices, key=lambda x: x['price_numeric'])
-        most_expensive = max(valid_prices, key=lambda x: x['price_numeric'])
-        
+
+        cheapest = summary['cheapest']
+        most_expensive = summary['most_expensive']
+
         return {
             "cheapest": {
                 "platform": cheapest.get('platform'),
@@ -874,22 +1382,21 @@ Generate detailed analysis focusing on Pakistani market conditions, local seller
         """Extract market insights from products"""
         total_products = len(products)
         platforms = set(p.get('platform') for p in products if p.get('platform'))
-        
-        prices = [p['price_numeric'] for p in products if p.get('price_numeric')]
-        
+
         insights = {
             "total_products": total_products,
             "platforms_found": list(platforms),
             "platform_count": len(platforms)
         }
-        
-        if prices:
+
+        summary = _summarize_prices(products)
+        if summary:
             insights["price_range"] = {
-                "min_price": min(prices),
-                "max_price": max(prices),
-                "average_price": sum(prices) / len(prices)
+                "min_price": summary['min'],
+                "max_price": summary['max'],
+                "average_price": summary['avg']
             }
-        
+
         return insights
     
     def _create_fallback_report(self, query: str, products: List[dict]) -> str:
@@ -911,27 +1418,33 @@ Generate detailed analysis focusing on Pakistani market conditions, local seller
     def _save_report_to_file(self, query: str, content: str, products: List[dict]) -> str:
         """Save report to markdown file"""
         try:
-            # Create reports directory
-            reports_dir = Path("data/reports")
-            reports_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            query_safe = "".join(c for c in query if c.isalnum() or c in (' ', '-', '_')).rstrip()
+            # Create reports directory (first save only)
+            global _reports_dir_ready
+            if not _reports_dir_ready:
+                _REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+                _reports_dir_ready = True
+
+            # One clock read: filename and header stamp the same instant
+            now = datetime.now()
+            timestamp = now.strftime("%Y%m%d_%H%M%S")
+            query_safe = _FILENAME_SAFE_RE.sub('', query).rstrip()
             query_safe = query_safe.replace(' ', '-')[:30]
-            
+
             filename = f"{query_safe}-{timestamp}-comparison.md"
-            filepath = reports_dir / filename
-            
-            # Create full report with metadata
-            full_report = f"# Pakistani E-commerce Price Comparison\n\n"
-            full_report += f"**Query:** {query}\n"
-            full_report += f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            full_report += f"**Products Analyzed:** {len(products)}\n"
-            full_report += f"**Analysis Method:** CrewAI Multi-Agent System\n\n"
-            full_report += "---\n\n"
-            full_report += content
+            filepath = _REPORTS_DIR / filename
             
+            # Compose the full report in one buffer so the file goes out
+            # as a single write instead of repeated string growth.
+            full_report = (
+                "# Pakistani E-commerce Price Comparison\n\n"
+                f"**Query:** {query}\n"
+                f"**Generated:** {now.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                f"**Products Analyzed:** {len(products)}\n"
+                "**Analysis Method:** CrewAI Multi-Agent System\n\n"
+                "---\n\n"
+                f"{content}"
+            )
+
             # Write to file
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write(full_report)
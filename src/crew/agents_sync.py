@@ -1,3 +1,4 @@
+import atexit
 import time
 import random
 import json
@@ -5,6 +6,8 @@ import logging
 import requests
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -15,6 +18,16 @@ from groq import Groq
 from playwright.sync_api import sync_playwright
 from dotenv import load_dotenv
 
+# Try to import orjson (optional - faster decode of Serper payloads)
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+except ImportError:
+    def _json_loads(data):
+        return json.loads(data)
+
 # Load environment variables
 load_dotenv()
 
@@ -25,6 +38,70 @@ logger = logging.getLogger(__name__)
 # Initialize clients
 groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
+# Shared keep-alive session: the three Serper queries reuse one pooled
+# TCP+TLS connection instead of handshaking per request.
+_SESSION = requests.Session()
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+# Per-query Serper response cache: the three query variations overlap
+# heavily across near-identical product lookups, so repeat queries are
+# answered in-process instead of re-hitting the API.
+_SERPER_QUERY_CACHE: Dict[str, Any] = {}
+_SERPER_CACHE_LOCK = threading.Lock()
+_SERPER_CACHE_TTL = 600
+_SERPER_CACHE_MAX = 128
+
+# Hot-loop regexes compiled once at import (per-card / per-result paths)
+_RATING_RE = re.compile(r'([\d.]+)')
+_PRICE_RE = re.compile(r'[\d,]+')
+_RS_RE = re.compile(r'Rs\.?\s*([\d,]+)')
+
+# All card fields extracted in one in-page pass: the per-card
+# query_selector/inner_text pattern cost four CDP round-trips per card.
+_CARDS_JS = """(maxProducts) => Array.from(document.querySelectorAll('.gridItem--Yd0sa'))
+    .slice(0, maxProducts)
+    .map(c => ({
+        title: c.querySelector('.title--wFj93')?.innerText || null,
+        price: c.querySelector('.currency--GVKjl')?.innerText || null,
+        url: c.querySelector('a[href*="/products/"]')?.getAttribute('href') || null,
+        rating: c.querySelector('[class*="rating"] span')?.innerText || null
+    }))"""
+
+# Warm browser singleton: Chromium cold-starts cost seconds per query,
+# so the browser is launched once and reused; each scrape only opens and
+# closes a context.
+_pw = None
+_browser = None
+_browser_lock = threading.Lock()
+
+
+def _get_browser(headless: bool = True):
+    global _pw, _browser
+    with _browser_lock:
+        if _browser is None or not _browser.is_connected():
+            _pw = sync_playwright().start()
+            # headless is fixed at first launch; later calls reuse it.
+            _browser = _pw.chromium.launch(headless=headless)
+        return _browser
+
+
+def _shutdown_browser():
+    global _pw, _browser
+    with _browser_lock:
+        try:
+            if _browser is not None and _browser.is_connected():
+                _browser.close()
+            if _pw is not None:
+                _pw.stop()
+        except Exception:
+            pass
+        _browser = None
+        _pw = None
+
+
+atexit.register(_shutdown_browser)
+
+
 def handle_agent_errors(func):
     def wrapper(*args, **kwargs):
         try:
@@ -50,15 +127,15 @@ class AgentA_DarazScraper(Agent):
     @handle_agent_errors
     def scrape_daraz_product(self, query: str, headless: bool = True, 
                            timeout: int = 30000, max_products: int = 3) -> List[Dict]:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=headless)
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080}
-            )
+        browser = _get_browser(headless=headless)
+        context = browser.new_context(
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            viewport={'width': 1920, 'height': 1080}
+        )
+        try:
             page = context.new_page()
             page.set_default_timeout(timeout)
-            
+
             try:
                 # Navigate to search page
                 encoded_query = quote_plus(query)
@@ -68,38 +145,30 @@ class AgentA_DarazScraper(Agent):
                 page.goto(search_url, wait_until='networkidle')
                 page.wait_for_selector('.gridItem--Yd0sa', timeout=10000)
                 
-                # Get product cards
+                # Get product cards - one evaluate returns every field
                 products = []
-                product_cards = page.query_selector_all('.gridItem--Yd0sa')[:max_products]
-                
-                for card in product_cards:
+                raw_cards = page.evaluate(_CARDS_JS, max_products)
+
+                for card in raw_cards:
                     try:
-                        # Get basic info from card
-                        title_el = card.query_selector('.title--wFj93')
-                        price_el = card.query_selector('.currency--GVKjl')
-                        link_el = card.query_selector('a[href*="/products/"]')
-                        rating_el = card.query_selector('[class*="rating"] span')
-                        
-                        if not (title_el and price_el and link_el):
-                            continue
-                        
-                        # Extract data
-                        title = title_el.inner_text()
-                        price_text = price_el.inner_text().strip()
-                        url = link_el.get_attribute('href')
+                        title = card['title']
+                        price_text = (card['price'] or '').strip()
+                        url = card['url']
                         rating = 0
-                        
-                        if rating_el:
+
+                        if not (title and price_text and url):
+                            continue
+
+                        if card['rating']:
                             try:
-                                rating_text = rating_el.inner_text()
-                                rating_match = re.search(r'([\d.]+)', rating_text)
+                                rating_match = _RATING_RE.search(card['rating'])
                                 if rating_match:
                                     rating = float(rating_match.group(1))
                             except:
                                 pass
-                        
+
                         # Clean price
-                        price_match = re.search(r'[\d,]+', price_text)
+                        price_match = _PRICE_RE.search(price_text)
                         if price_match:
                             price = float(price_match.group(0).replace(',', ''))
                         else:
@@ -122,16 +191,18 @@ class AgentA_DarazScraper(Agent):
                         logger.error(f"Error processing product card: {e}")
                         continue
                 
-                browser.close()
                 return products if products else [{"error": "No products found", "status": "failed"}]
-                
+
             except Exception as e:
                 logger.error(f"Error in Agent A scraping: {e}")
-                try:
-                    browser.close()
-                except:
-                    pass
                 return [{"error": str(e), "status": "failed"}]
+        finally:
+            # Only the context closes; the warm browser stays up for the
+            # next query.
+            try:
+                context.close()
+            except Exception:
+                pass
 
 class AgentB_SerperSearch(Agent):
     def __init__(self):
@@ -159,28 +230,47 @@ class AgentB_SerperSearch(Agent):
         ]
         
         all_results = []
-        
-        for search_query in search_queries:
+
+        def _fetch(search_query):
+            now = time.monotonic()
+            with _SERPER_CACHE_LOCK:
+                entry = _SERPER_QUERY_CACHE.get(search_query)
+                if entry is not None and entry[0] > now:
+                    return entry[1]
             try:
                 logger.info(f"📡 Agent B: Serper query: {search_query[:50]}...")
-                
-                response = requests.post(
+                response = _SESSION.post(
                     "https://google.serper.dev/search",
                     headers={"X-API-KEY": self.api_key},
-                    json={"q": search_query, "num": 10}
+                    json={"q": search_query, "num": 10},
+                    timeout=10
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    for result in data.get('organic', []):
-                        processed = self._process_search_result(result)
-                        if processed:
-                            all_results.append(processed)
-                            
             except Exception as e:
                 logger.error(f"Error in search query: {e}")
-                continue
-        
+                return None
+            if response.status_code != 200:
+                return None
+            organic = _json_loads(response.content).get('organic', [])
+            with _SERPER_CACHE_LOCK:
+                if len(_SERPER_QUERY_CACHE) >= _SERPER_CACHE_MAX:
+                    # Drop the entry closest to expiry to stay bounded
+                    oldest = min(_SERPER_QUERY_CACHE, key=lambda k: _SERPER_QUERY_CACHE[k][0])
+                    del _SERPER_QUERY_CACHE[oldest]
+                _SERPER_QUERY_CACHE[search_query] = (now + _SERPER_CACHE_TTL, organic)
+            return organic
+
+        # The queries are independent, so submit them together; wall time
+        # tracks the slowest response instead of the sum.
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            responses = list(executor.map(_fetch, search_queries))
+
+        for organic in responses:
+            if organic:
+                for result in organic:
+                    processed = self._process_search_result(result)
+                    if processed:
+                        all_results.append(processed)
+
         # Remove duplicates
         unique_results = []
         seen_urls = set()
@@ -201,7 +291,7 @@ class AgentB_SerperSearch(Agent):
             url = result.get('link', '')
             
             # Extract price
-            price_match = re.search(r'Rs\.?\s*([\d,]+)', f"{title} {snippet}")
+            price_match = _RS_RE.search(f"{title} {snippet}")
             if not price_match:
                 return None
                 
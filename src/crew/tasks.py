@@ -4,16 +4,18 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-
-def create_task_a_daraz_scraping(agents: Dict, query: str, **kwargs) -> Task:
-    task_description = f"""
+# Task prompts as module constants: building a 40-80 line f-string per
+# call re-interpolates the whole template every time, and keeping the
+# static text in one place makes trimming prompt tokens reviewable.
+# Only the small dynamic fields are substituted via format_map.
+_TASK_A_TMPL = """
     **TASK A: DARAZ PRODUCT SCRAPING**
     
     Search and extract comprehensive product information from Daraz.pk for the query: "{query}"
     
     **Specific Requirements:**
     1. Navigate to Daraz.pk and search for: "{query}"
-    2. Select product at index: {kwargs.get('index', 0)}
+    2. Select product at index: {index}
     3. Extract complete product details:
        - Product title and description
        - Price information (PKR)
@@ -23,9 +25,17 @@ def create_task_a_daraz_scraping(agents: Dict, query: str, **kwargs) -> Task:
        - Availability status
     
     **Browser Configuration:**
-    - Headless mode: {kwargs.get('headless', False)}
-    - Timeout: {kwargs.get('timeout', 30000)}ms
+    - Headless mode: {headless}
+    - Timeout: {timeout}ms
     - User agent: Desktop Chrome
+    - Register a page.on('response') listener for the Daraz search JSON XHR
+      and parse product data from the captured payload directly
+    - Fall back to DOM scraping only if no matching JSON response arrives
+      within a few seconds
+    - Block non-essential resources via page.route: image, stylesheet, font,
+      media, beacon, csp_report, imageset, texttrack, plus third-party
+      analytics/ad hosts (googletagmanager, google-analytics, doubleclick,
+      facebook)
     
     **Expected Output:**
     Structured JSON with product data including title, price_pkr, seller, rating_average, url, and status.
@@ -33,17 +43,8 @@ def create_task_a_daraz_scraping(agents: Dict, query: str, **kwargs) -> Task:
     **Error Handling:**
     If scraping fails, return error details with fallback recommendations.
     """
-    
-    return Task(
-        description=task_description,
-        agent=agents['agent_a_daraz'],
-        expected_output="JSON object with Daraz product data including title, price, seller, and URL"
-    )
-
 
-def create_task_b_serper_search_and_process(agents: Dict, query: str, **kwargs) -> Task:
-    
-    task_description = f"""
+_TASK_B_TMPL = """
     **TASK B: PAKISTANI MARKETPLACE SEARCH + DIRECT PROCESSING**
     
     Search Pakistani e-commerce sites using Serper.dev API and process results directly for: "{query}"
@@ -52,7 +53,7 @@ def create_task_b_serper_search_and_process(agents: Dict, query: str, **kwargs)
     1. Use Serper.dev API with Pakistani geo-targeting (gl=pk)
     2. Target specific sites: PriceOye.pk, OLX.com.pk, Telemart.pk, Shophive.pk
     3. Use multiple query variations for comprehensive coverage
-    4. Maximum results per platform: {kwargs.get('max_results', 10)}
+    4. Maximum results per platform: {max_results}
     
     **Direct Processing Requirements:**
     1. Extract product information from search results:
@@ -62,11 +63,9 @@ def create_task_b_serper_search_and_process(agents: Dict, query: str, **kwargs)
        - Product URLs
        - Availability indicators
     
-    2. Price extraction using regex patterns:
-       - Rs. 50,000 format
-       - PKR 50,000 format  
-       - 50,000 PKR format
-       - Price: Rs. 50,000 format
+    2. Price extraction via the extract_price_pkr helper (single compiled
+       alternation covering Rs. 50,000 / PKR 50,000 / 50,000 PKR /
+       Price: Rs. 50,000 formats in one scan)
     
     3. Data structure requirements:
        - title: Product name
@@ -90,19 +89,8 @@ def create_task_b_serper_search_and_process(agents: Dict, query: str, **kwargs)
     **Expected Output:**
     JSON object with processed product results including titles, prices (PKR), platforms, and URLs.
     """
-    
-    # This task depends on Task A output (product title from Daraz)
-    return Task(
-        description=task_description,
-        agent=agents['agent_b_serper'],
-        expected_output="JSON with processed product results from Pakistani e-commerce sites",
-        context=[] # Will be set dynamically with Task A results
-    )
-
 
-def create_task_d_report_generation(agents: Dict, query: str, **kwargs) -> Task:
-    
-    task_description = f"""
+_TASK_D_TMPL = """
     **TASK D: COMPREHENSIVE PRICE COMPARISON REPORT**
     
     Generate a detailed Pakistani e-commerce comparison report for: "{query}"
@@ -169,6 +157,45 @@ def create_task_d_report_generation(agents: Dict, query: str, **kwargs) -> Task:
     **Error Handling:**
     If LLM processing fails, generate fallback report with available data.
     """
+
+
+def create_task_a_daraz_scraping(agents: Dict, query: str, **kwargs) -> Task:
+    task_description = _TASK_A_TMPL.format_map({
+        'query': query,
+        'index': kwargs.get('index', 0),
+        'headless': kwargs.get('headless', False),
+        'timeout': kwargs.get('timeout', 30000),
+    })
+    
+    return Task(
+        description=task_description,
+        agent=agents['agent_a_daraz'],
+        expected_output="JSON object with Daraz product data including title, price, seller, and URL",
+        async_execution=True
+    )
+
+
+def create_task_b_serper_search_and_process(agents: Dict, query: str, **kwargs) -> Task:
+    
+    task_description = _TASK_B_TMPL.format_map({
+        'query': query,
+        'max_results': kwargs.get('max_results', 10),
+    })
+    
+    # Independent of Task A: the user query is a perfectly good Serper
+    # search string, so B doesn't wait on the Daraz title.
+    return Task(
+        description=task_description,
+        agent=agents['agent_b_serper'],
+        expected_output="JSON with processed product results from Pakistani e-commerce sites",
+        context=[],
+        async_execution=True
+    )
+
+
+def create_task_d_report_generation(agents: Dict, query: str, **kwargs) -> Task:
+    
+    task_description = _TASK_D_TMPL.format_map({'query': query})
     
     # This task depends on both Task A and Task B results
     return Task(
@@ -193,16 +220,15 @@ def get_new_tasks(agents: Dict, query: str, **kwargs) -> list:
     task_d = create_task_d_report_generation(agents, query, **kwargs)
     
     # Set up task dependencies
-    # Task B depends on Task A (uses Daraz product title for better search)
-    task_b.context = [task_a]
-    
+    # Tasks A and B are independent (async_execution) so they run
+    # concurrently; wall time tracks the slower of the two, not the sum.
     # Task D depends on both Task A and Task B
     task_d.context = [task_a, task_b]
-    
+
     logger.info("📋 Task workflow created:")
     logger.info("   Task A: Daraz Product Scraping")
     logger.info("   Task B: Serper Search + Direct Processing (NO Agent C)")
     logger.info("   Task D: Report Generation")
-    logger.info("   Dependencies: A → B → D")
+    logger.info("   Dependencies: (A ∥ B) → D")
     
     return [task_a, task_b, task_d]
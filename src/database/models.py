@@ -1,20 +1,79 @@
+import secrets
 import sqlite3
 import json
-import uuid
+import threading
+import time
+import zlib
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from pathlib import Path
 
 
-class MarketplaceDB:    
+def _normalize_query(query: str) -> str:
+    # Lowercase + collapsed whitespace so trivially-different spellings
+    # of the same query share one cache row.
+    return ' '.join(query.strip().lower().split())
+
+
+def _fetch_dicts(conn, sql: str, params: tuple) -> List[Dict[str, Any]]:
+    # dict(zip(cols, row)) over plain tuples beats sqlite3.Row + dict(row),
+    # which re-iterates and hashes column names per row in pure Python.
+    cur = conn.execute(sql, params)
+    cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def _new_id() -> str:
+    # Time-ordered ids: new keys append at the tail of the primary-key
+    # B-tree instead of splitting pages all over it like random UUIDs do.
+    return f"{time.time_ns():016x}{secrets.token_hex(8)}"
+
+
+class MarketplaceDB:
+    # get_query_data SQL as class constants: sqlite3 caches prepared
+    # statements per connection keyed by the SQL string, so reusing the
+    # same string objects guarantees cache hits on this per-report path.
+    _SQL_QUERY_INFO = "SELECT * FROM queries WHERE id = ?"
+    # raw_data lives in a sibling blob table; the hot fetch lists the
+    # typed columns so it never drags multi-KB JSON through the page cache.
+    _SQL_RAW_PRODUCTS = '''SELECT id, query_id, source, title, price_pkr, price_text,
+                description, rating_average, seller, availability, url, fetched_at
+                FROM raw_products WHERE query_id = ?'''
+    _SQL_NORMALIZED_PRODUCTS = "SELECT * FROM normalized_products WHERE query_id = ?"
+    _SQL_PRICE_ANALYSIS = "SELECT * FROM price_analysis WHERE query_id = ?"
+    _SQL_REPORTS = "SELECT * FROM reports WHERE query_id = ?"
+
     def __init__(self, db_path: str = "data/marketplace.db"):
         """Initialize database connection."""
         self.db_path = db_path
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._pragmas_applied = False
+        self._local = threading.local()
         self.init_tables()
-    
+
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        # One long-lived connection per thread: opening sqlite3 connections
+        # per call re-parses the schema and re-applies PRAGMAs every time.
+        # Call sites keep using `with self.get_connection() as conn:` - as a
+        # context manager the connection commits on exit without closing.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            # WAL persists in the database file, so it only needs setting
+            # once per process; the rest are per-connection. WAL + NORMAL
+            # sync: readers stop blocking writers and commits no longer
+            # fsync individually.
+            if not self._pragmas_applied:
+                conn.execute("PRAGMA journal_mode=WAL")
+                self._pragmas_applied = True
+            conn.executescript('''
+                PRAGMA synchronous=NORMAL;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA mmap_size=268435456;
+                PRAGMA cache_size=-65536;
+            ''')
+            self._local.conn = conn
+        return conn
     
     def init_tables(self):
         with self.get_connection() as conn:
@@ -39,10 +98,15 @@ class MarketplaceDB:
                     availability TEXT,
                     url TEXT,
                     fetched_at TEXT,
-                    raw_data TEXT,
                     FOREIGN KEY (query_id) REFERENCES queries (id)
                 );
                 
+                CREATE TABLE IF NOT EXISTS raw_products_blob (
+                    raw_product_id TEXT PRIMARY KEY,
+                    raw_data BLOB,
+                    FOREIGN KEY (raw_product_id) REFERENCES raw_products (id)
+                );
+
                 CREATE TABLE IF NOT EXISTS normalized_products (
                     id TEXT PRIMARY KEY,
                     query_id TEXT NOT NULL,
@@ -87,14 +151,31 @@ class MarketplaceDB:
                     FOREIGN KEY (query_id) REFERENCES queries (id)
                 );
                 
+                CREATE TABLE IF NOT EXISTS query_cache (
+                    query_norm TEXT PRIMARY KEY,
+                    task_a_json BLOB,
+                    task_b_json BLOB,
+                    created_at INTEGER
+                );
+
                 CREATE INDEX IF NOT EXISTS idx_queries_created_at ON queries(created_at);
                 CREATE INDEX IF NOT EXISTS idx_raw_products_query_id ON raw_products(query_id);
                 CREATE INDEX IF NOT EXISTS idx_normalized_products_cluster ON normalized_products(comparable_cluster_id);
                 CREATE INDEX IF NOT EXISTS idx_price_analysis_cluster ON price_analysis(cluster_id);
+
+                -- Composite indices for the report path: per-platform
+                -- breakdowns within a query become bounded range reads
+                -- instead of filter scans over all of the query's rows.
+                CREATE INDEX IF NOT EXISTS idx_raw_products_query_source ON raw_products(query_id, source);
+                CREATE INDEX IF NOT EXISTS idx_normalized_products_query_cluster ON normalized_products(query_id, comparable_cluster_id);
+                CREATE INDEX IF NOT EXISTS idx_reports_query_id ON reports(query_id);
             ''')
+            # Refresh planner statistics so the new composite indices
+            # actually get picked once tables have data.
+            conn.execute("ANALYZE")
     
     def create_query(self, query: str) -> str:
-        query_id = str(uuid.uuid4())
+        query_id = _new_id()
         with self.get_connection() as conn:
             conn.execute(
                 "INSERT INTO queries (id, query, created_at) VALUES (?, ?, ?)",
@@ -102,99 +183,176 @@ class MarketplaceDB:
             )
         return query_id
     
-    def save_raw_products(self, query_id: str, products: List[Dict[str, Any]]) -> List[str]:
-        product_ids = []
+    def save_raw_products(self, query_id: str, products: Iterable[Dict[str, Any]],
+                          batch_size: int = 500) -> Iterator[str]:
+        """Stream raw products to disk in batches, yielding ids as committed.
+
+        Accepts any iterable, so large result sets flow through bounded
+        memory: each executemany batch (statement prepared once, bound per
+        row) commits before its ids are yielded. Lazy - callers that need
+        the full id list should wrap with list(...).
+        """
+        batch_ids: List[str] = []
+        rows = []
+        blob_rows = []
+        for product in products:
+            product_id = _new_id()
+            batch_ids.append(product_id)
+            rows.append((
+                product_id,
+                query_id,
+                product.get('source', 'unknown'),
+                product.get('title'),
+                product.get('price_pkr'),
+                product.get('price_text'),
+                product.get('description'),
+                product.get('rating_average'),
+                product.get('seller'),
+                product.get('availability'),
+                product.get('url'),
+                product.get('fetched_at')
+            ))
+            # Full JSON goes to the sibling blob table, zlib-compressed
+            # (about half the size), so typed-row reads never touch it.
+            blob_rows.append((product_id, zlib.compress(json.dumps(product).encode())))
+
+            if len(rows) >= batch_size:
+                self._flush_raw_products(rows, blob_rows)
+                yield from batch_ids
+                batch_ids, rows, blob_rows = [], [], []
+
+        if rows:
+            self._flush_raw_products(rows, blob_rows)
+            yield from batch_ids
+
+    def _flush_raw_products(self, rows, blob_rows):
         with self.get_connection() as conn:
-            for product in products:
-                product_id = str(uuid.uuid4())
-                product_ids.append(product_id)
-                
-                conn.execute('''
-                    INSERT INTO raw_products 
-                    (id, query_id, source, title, price_pkr, price_text, description, 
-                     rating_average, seller, availability, url, fetched_at, raw_data)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    product_id,
-                    query_id,
-                    product.get('source', 'unknown'),
-                    product.get('title'),
-                    product.get('price_pkr'),
-                    product.get('price_text'),
-                    product.get('description'),
-                    product.get('rating_average'),
-                    product.get('seller'),
-                    product.get('availability'),
-                    product.get('url'),
-                    product.get('fetched_at'),
-                    json.dumps(product)
-                ))
-        
-        return product_ids
+            conn.executemany('''
+                INSERT INTO raw_products
+                (id, query_id, source, title, price_pkr, price_text, description,
+                 rating_average, seller, availability, url, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.executemany(
+                "INSERT INTO raw_products_blob (raw_product_id, raw_data) VALUES (?, ?)",
+                blob_rows
+            )
+
+    def get_cached_tasks(self, query: str, ttl_seconds: int = 3600) -> Optional[Dict[str, Any]]:
+        """Return cached Task A/B outputs for a query, or None if stale/missing."""
+        with self.get_connection() as conn:
+            row = conn.execute(
+                "SELECT task_a_json, task_b_json, created_at FROM query_cache WHERE query_norm = ?",
+                (_normalize_query(query),)
+            ).fetchone()
+        if row is None or time.time() - row[2] > ttl_seconds:
+            return None
+        return {
+            'task_a_daraz': json.loads(zlib.decompress(row[0])),
+            'task_b_processed': json.loads(zlib.decompress(row[1]))
+        }
+
+    def set_cached_tasks(self, query: str, task_a: Dict[str, Any], task_b: Dict[str, Any]):
+        """Store Task A/B outputs so repeat queries skip scraping entirely."""
+        with self.get_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO query_cache (query_norm, task_a_json, task_b_json, created_at) VALUES (?, ?, ?, ?)",
+                (
+                    _normalize_query(query),
+                    zlib.compress(json.dumps(task_a).encode()),
+                    zlib.compress(json.dumps(task_b).encode()),
+                    int(time.time())
+                )
+            )
+
+    def get_raw_blob(self, raw_product_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch the original scraped payload for one raw product on demand."""
+        with self.get_connection() as conn:
+            row = conn.execute(
+                "SELECT raw_data FROM raw_products_blob WHERE raw_product_id = ?",
+                (raw_product_id,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
     
-    def save_normalized_products(self, query_id: str, products: List[Dict[str, Any]]) -> List[str]:
-        product_ids = []
+    def save_normalized_products(self, query_id: str, products: Iterable[Dict[str, Any]],
+                                 batch_size: int = 500) -> Iterator[str]:
+        """Stream normalized products to disk in batches, yielding ids as committed.
+
+        Same lazy batching contract as save_raw_products.
+        """
+        batch_ids: List[str] = []
+        rows = []
+        for product in products:
+            product_id = _new_id()
+            batch_ids.append(product_id)
+            rows.append((
+                product_id,
+                query_id,
+                product.get('raw_product_id', ''),
+                product.get('title'),
+                product.get('brand'),
+                product.get('model'),
+                product.get('capacity'),
+                product.get('pta_status'),
+                product.get('price_pkr'),
+                product.get('seller'),
+                product.get('rating_average'),
+                product.get('source'),
+                product.get('url'),
+                product.get('fetched_at'),
+                product.get('comparable_cluster_id'),
+                product.get('match_confidence')
+            ))
+
+            if len(rows) >= batch_size:
+                self._flush_normalized_products(rows)
+                yield from batch_ids
+                batch_ids, rows = [], []
+
+        if rows:
+            self._flush_normalized_products(rows)
+            yield from batch_ids
+
+    def _flush_normalized_products(self, rows):
         with self.get_connection() as conn:
-            for product in products:
-                product_id = str(uuid.uuid4())
-                product_ids.append(product_id)
-                
-                conn.execute('''
-                    INSERT INTO normalized_products 
-                    (id, query_id, raw_product_id, title, brand, model, capacity, pta_status,
-                     price_pkr, seller, rating_average, source, url, fetched_at, 
-                     comparable_cluster_id, match_confidence)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    product_id,
-                    query_id,
-                    product.get('raw_product_id', ''),
-                    product.get('title'),
-                    product.get('brand'),
-                    product.get('model'),
-                    product.get('capacity'),
-                    product.get('pta_status'),
-                    product.get('price_pkr'),
-                    product.get('seller'),
-                    product.get('rating_average'),
-                    product.get('source'),
-                    product.get('url'),
-                    product.get('fetched_at'),
-                    product.get('comparable_cluster_id'),
-                    product.get('match_confidence')
-                ))
-        
-        return product_ids
+            conn.executemany('''
+                INSERT INTO normalized_products
+                (id, query_id, raw_product_id, title, brand, model, capacity, pta_status,
+                 price_pkr, seller, rating_average, source, url, fetched_at,
+                 comparable_cluster_id, match_confidence)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
     
     def save_price_analysis(self, query_id: str, analysis: List[Dict[str, Any]]) -> List[str]:
-        analysis_ids = []
+        analysis_ids = [_new_id() for _ in analysis]
+        analysis_date = datetime.utcnow().isoformat()
+        rows = [(
+            analysis_id,
+            query_id,
+            item.get('cluster_id'),
+            item.get('min_price'),
+            item.get('max_price'),
+            item.get('avg_price'),
+            item.get('cheapest_vendor'),
+            item.get('cheapest_product_id'),
+            item.get('product_count'),
+            analysis_date
+        ) for analysis_id, item in zip(analysis_ids, analysis)]
+
         with self.get_connection() as conn:
-            for item in analysis:
-                analysis_id = str(uuid.uuid4())
-                analysis_ids.append(analysis_id)
-                
-                conn.execute('''
-                    INSERT INTO price_analysis 
-                    (id, query_id, cluster_id, min_price, max_price, avg_price,
-                     cheapest_vendor, cheapest_product_id, product_count, analysis_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    analysis_id,
-                    query_id,
-                    item.get('cluster_id'),
-                    item.get('min_price'),
-                    item.get('max_price'),
-                    item.get('avg_price'),
-                    item.get('cheapest_vendor'),
-                    item.get('cheapest_product_id'),
-                    item.get('product_count'),
-                    datetime.utcnow().isoformat()
-                ))
-        
+            conn.executemany('''
+                INSERT INTO price_analysis
+                (id, query_id, cluster_id, min_price, max_price, avg_price,
+                 cheapest_vendor, cheapest_product_id, product_count, analysis_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
         return analysis_ids
     
     def save_report(self, query_id: str, report_type: str, file_path: str) -> str:
-        report_id = str(uuid.uuid4())
+        report_id = _new_id()
         with self.get_connection() as conn:
             conn.execute(
                 "INSERT INTO reports (id, query_id, report_type, file_path, created_at) VALUES (?, ?, ?, ?, ?)",
@@ -203,35 +361,19 @@ class MarketplaceDB:
         return report_id
     
     def get_query_data(self, query_id: str) -> Dict[str, Any]:
+        # Single `with conn:` transaction so the five reads share one
+        # read lock and a warm page cache instead of five lock cycles.
         with self.get_connection() as conn:
-            conn.row_factory = sqlite3.Row
-            
-            query_info = conn.execute(
-                "SELECT * FROM queries WHERE id = ?", (query_id,)
-            ).fetchone()
-            
-            raw_products = conn.execute(
-                "SELECT * FROM raw_products WHERE query_id = ?", (query_id,)
-            ).fetchall()
-            
-            normalized_products = conn.execute(
-                "SELECT * FROM normalized_products WHERE query_id = ?", (query_id,)
-            ).fetchall()
-            
-            price_analysis = conn.execute(
-                "SELECT * FROM price_analysis WHERE query_id = ?", (query_id,)
-            ).fetchall()
-            
-            reports = conn.execute(
-                "SELECT * FROM reports WHERE query_id = ?", (query_id,)
-            ).fetchall()
-            
+            params = (query_id,)
+
+            query_info = _fetch_dicts(conn, self._SQL_QUERY_INFO, params)
+
             return {
-                'query': dict(query_info) if query_info else None,
-                'raw_products': [dict(row) for row in raw_products],
-                'normalized_products': [dict(row) for row in normalized_products],
-                'price_analysis': [dict(row) for row in price_analysis],
-                'reports': [dict(row) for row in reports]
+                'query': query_info[0] if query_info else None,
+                'raw_products': _fetch_dicts(conn, self._SQL_RAW_PRODUCTS, params),
+                'normalized_products': _fetch_dicts(conn, self._SQL_NORMALIZED_PRODUCTS, params),
+                'price_analysis': _fetch_dicts(conn, self._SQL_PRICE_ANALYSIS, params),
+                'reports': _fetch_dicts(conn, self._SQL_REPORTS, params)
             }
     
     def update_query_status(self, query_id: str, status: str):
@@ -243,9 +385,8 @@ class MarketplaceDB:
     
     def get_recent_queries(self, limit: int = 10) -> List[Dict[str, Any]]:
         with self.get_connection() as conn:
-            conn.row_factory = sqlite3.Row
-            rows = conn.execute(
+            return _fetch_dicts(
+                conn,
                 "SELECT * FROM queries ORDER BY created_at DESC LIMIT ?",
                 (limit,)
-            ).fetchall()
-            return [dict(row) for row in rows]
+            )
@@ -4,15 +4,33 @@ Modern SaaS-style interface for comparing prices across Pakistani marketplaces.
 """
 import streamlit as st
 import asyncio
+from collections import deque
+from functools import lru_cache
 import os
 import sys
 import subprocess
+import threading
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import json
-from rich.console import Console
-import plotly.express as px
+
+# Try to import orjson (optional - faster recent-searches parse/serialize)
+try:
+    import orjson
+
+    def _json_load_bytes(data):
+        return orjson.loads(data)
+
+    def _json_dump_bytes(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def _json_load_bytes(data):
+        return json.loads(data)
+
+    def _json_dump_bytes(obj):
+        return json.dumps(obj).encode()
 from dotenv import load_dotenv
 
 # Load .env file first (for local development)
@@ -45,143 +63,267 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for modern SaaS look
-st.markdown("""
-<style>
-    /* Modern color scheme */
-    :root {
-        --primary-color: #FF4B4B;
-        --secondary-color: #4B4BFF;
-        --background-color: #FFFFFF;
-        --text-color: #31333F;
-        --card-bg: #F8F9FA;
-        --border-color: #E1E5E9;
-    }
-    
-    /* Header styling */
-    h1, h2, h3 {
-        color: var(--text-color);
-        font-family: 'Segoe UI', sans-serif;
-    }
-    
-    /* Fix metric cards visibility */
-    div[data-testid="metric-container"] {
-        background-color: var(--card-bg) !important;
-        border: 1px solid var(--border-color) !important;
-        border-radius: 10px !important;
-        padding: 1rem !important;
-        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1) !important;
-    }
-    
-    div[data-testid="metric-container"] > div {
-        color: var(--text-color) !important;
-    }
-    
-    div[data-testid="metric-container"] label {
-        color: #666 !important;
-        font-weight: 500 !important;
-    }
-    
-    div[data-testid="metric-container"] [data-testid="metric-value"] {
-        color: var(--primary-color) !important;
-        font-weight: bold !important;
-        font-size: 1.5rem !important;
-    }
-    
-    /* Card-like containers */
-    div.stDataFrame {
-        border-radius: 10px;
-        padding: 1rem;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        background-color: white;
-        border: 1px solid var(--border-color);
-    }
-    
-    /* Button styling */
-    .stButton > button {
-        border-radius: 20px;
-        font-weight: 500;
-        border: 1px solid var(--border-color);
-    }
-    
-    /* Expander styling - Fix for reports section */
-    div[data-testid="stExpander"] {
-        background-color: white !important;
-        border: 1px solid var(--border-color) !important;
-        border-radius: 10px !important;
-        margin-bottom: 1rem !important;
-        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05) !important;
-    }
-    
-    div[data-testid="stExpander"] > div:first-child {
-        background-color: var(--card-bg) !important;
-        border-radius: 10px 10px 0 0 !important;
-        padding: 0.75rem 1rem !important;
-    }
-    
-    div[data-testid="stExpander"] > div:last-child {
-        background-color: white !important;
-        padding: 1rem !important;
-        border-radius: 0 0 10px 10px !important;
-    }
-    
-    /* Success/Info messages */
-    div[data-testid="stAlert"] {
-        border-radius: 10px;
-    }
-    
-    /* Improve table styling */
-    div[data-testid="stDataFrame"] table {
-        border-collapse: separate !important;
-        border-spacing: 0 !important;
-        border-radius: 10px !important;
-        overflow: hidden !important;
-        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1) !important;
-    }
-    
-    div[data-testid="stDataFrame"] th {
-        background-color: var(--card-bg) !important;
-        font-weight: 600 !important;
-        color: var(--text-color) !important;
-        border-bottom: 2px solid var(--border-color) !important;
-    }
-    
-    div[data-testid="stDataFrame"] td {
-        border-bottom: 1px solid #F0F0F0 !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Widget-level overrides only - the base palette (primary/background/
+# text colors, font) comes from .streamlit/config.toml [theme], which
+# Streamlit applies natively without a style recalculation. Minified to
+# keep the per-rerun forward message small.
+_CSS = (
+    "<style>"
+    "div[data-testid='metric-container']{background-color:#F8F9FA!important;"
+    "border:1px solid #E1E5E9!important;border-radius:10px!important;"
+    "padding:1rem!important;box-shadow:0 2px 4px rgba(0,0,0,.1)!important}"
+    "div[data-testid='metric-container']>div{color:#31333F!important}"
+    "div[data-testid='metric-container'] label{color:#666!important;font-weight:500!important}"
+    "div[data-testid='metric-container'] [data-testid='metric-value']"
+    "{color:#FF4B4B!important;font-weight:bold!important;font-size:1.5rem!important}"
+    "div.stDataFrame{border-radius:10px;padding:1rem;"
+    "box-shadow:0 4px 6px rgba(0,0,0,.1);background-color:white;border:1px solid #E1E5E9}"
+    ".stButton>button{border-radius:20px;font-weight:500;border:1px solid #E1E5E9}"
+    "div[data-testid='stExpander']{background-color:white!important;"
+    "border:1px solid #E1E5E9!important;border-radius:10px!important;"
+    "margin-bottom:1rem!important;box-shadow:0 2px 4px rgba(0,0,0,.05)!important}"
+    "div[data-testid='stExpander']>div:first-child{background-color:#F8F9FA!important;"
+    "border-radius:10px 10px 0 0!important;padding:.75rem 1rem!important}"
+    "div[data-testid='stExpander']>div:last-child{background-color:white!important;"
+    "padding:1rem!important;border-radius:0 0 10px 10px!important}"
+    "div[data-testid='stAlert']{border-radius:10px}"
+    "div[data-testid='stDataFrame'] table{border-collapse:separate!important;"
+    "border-spacing:0!important;border-radius:10px!important;overflow:hidden!important;"
+    "box-shadow:0 2px 8px rgba(0,0,0,.1)!important}"
+    "div[data-testid='stDataFrame'] th{background-color:#F8F9FA!important;"
+    "font-weight:600!important;color:#31333F!important;border-bottom:2px solid #E1E5E9!important}"
+    "div[data-testid='stDataFrame'] td{border-bottom:1px solid #F0F0F0!important}"
+    "</style>"
+)
+
+# Recent searches are split: the index file holds only query/timestamp/id
+# (a few bytes per row, parsed on every rerun), while full result payloads
+# live one file per search and load lazily on click.
+_RECENT_INDEX_PATH = Path("data/recent_searches.json")
+_SEARCH_PAYLOADS_DIR = Path("data/searches")
 
+# Platform badge lookup, highest priority first. Module scope so the
+# tuple isn't rebuilt per call and new marketplaces get added in one
+# place.
+_PLATFORM_EMOJI = (
+    ('olx', '🔄'),
+    ('priceoye', '💻'),
+    ('telemart', '📱'),
+)
+_DEFAULT_EMOJI = '🏪'
+
+
+@st.cache_data(ttl=60, show_spinner=False)
 def load_recent_searches():
-    """Load recent searches from JSON file."""
+    """Load the recent-searches index (query/timestamp/id rows only).
+
+    Cached so reruns triggered by every widget interaction don't re-open
+    and re-parse the file; save_recent_search clears the cache on write.
+    """
     try:
-        path = Path("data/recent_searches.json")
-        if path.exists():
-            with open(path, "r") as f:
-                return json.load(f)
+        if _RECENT_INDEX_PATH.exists():
+            return _json_load_bytes(_RECENT_INDEX_PATH.read_bytes())
     except Exception:
         pass
     return []
 
+def load_search_result(search):
+    """Lazily load the stored result payload for one index entry."""
+    try:
+        search_id = search.get('id')
+        if search_id:
+            payload_path = _SEARCH_PAYLOADS_DIR / f"{search_id}.json"
+            if payload_path.exists():
+                return _json_load_bytes(payload_path.read_bytes())
+        # Entries written before the index/payload split carry the full
+        # result inline.
+        return search.get('results')
+    except Exception:
+        return None
+
+def _atomic_write_bytes(path, data):
+    """Write to a sibling .tmp file and os.replace() it into place.
+
+    replace() is atomic on the same filesystem, so a rerun (or crash)
+    mid-write can never leave a truncated JSON file behind.
+    """
+    tmp = path.with_suffix('.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
 def save_recent_search(query, result):
     """Save search to recent searches."""
     try:
-        searches = load_recent_searches()
-        searches.insert(0, {
+        search_id = result.get('query_id') or datetime.now().strftime('%Y%m%d%H%M%S%f')
+
+        # deque(maxlen=10) gives O(1) prepend with the size cap built in,
+        # instead of insert(0) shifting every element plus a slice copy.
+        searches = deque(load_recent_searches(), maxlen=10)
+        searches.appendleft({
             "query": query,
             "timestamp": datetime.now().isoformat(),
-            "results": result
+            "id": search_id
         })
-        # Keep only last 10 searches
-        searches = searches[:10]
-        
-        path = Path("data/recent_searches.json")
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w") as f:
-            json.dump(searches, f)
+
+        # Serialize up front, then push the disk I/O off the scriptrun
+        # thread; the result page renders without waiting on the writes.
+        payload_bytes = _json_dump_bytes(result)
+        index_bytes = _json_dump_bytes(list(searches))
+        keep_ids = {s['id'] for s in searches if s.get('id')}
+
+        def _write():
+            _SEARCH_PAYLOADS_DIR.mkdir(parents=True, exist_ok=True)
+            _atomic_write_bytes(_SEARCH_PAYLOADS_DIR / f"{search_id}.json", payload_bytes)
+            _atomic_write_bytes(_RECENT_INDEX_PATH, index_bytes)
+            # Payload files whose ids fell out of the 10-entry index are
+            # unreachable; prune them so data/searches stays bounded.
+            for stale in _SEARCH_PAYLOADS_DIR.glob('*.json'):
+                if stale.stem not in keep_ids:
+                    try:
+                        stale.unlink()
+                    except OSError:
+                        pass
+            # Invalidate the cached read only after the new index is on
+            # disk, so a rerun can't re-read the stale file into cache.
+            load_recent_searches.clear()
+
+        threading.Thread(target=_write, daemon=True).start()
     except Exception as e:
         st.error(f"Failed to save search: {e}")
 
+@st.cache_data(show_spinner=False)
+def _build_comparison(query_id, _results_data):
+    """Derive the sorted product list and display/chart frames for one query.
+
+    Cached on query_id (the underscore prefix keeps st.cache_data from
+    hashing the nested results dict), so reruns triggered by unrelated
+    widgets - e.g. a report download button - skip the list building,
+    sort and DataFrame construction.
+    """
+    daraz_product = _results_data.get('daraz_product')
+    marketplace_products = _results_data.get('marketplace_products', [])
+
+    # Build the combined table column-wise: one DataFrame over all the
+    # marketplace products instead of a per-row dict/f-string loop.
+    frames = []
+
+    # Daraz product first (if available)
+    if daraz_product and daraz_product.get('price_numeric'):
+        frames.append(pd.DataFrame([{
+            'Platform': '🛒 Daraz.pk',
+            'price_numeric': daraz_product.get('price_numeric'),
+            'url': daraz_product.get('url', ''),
+            'title': daraz_product.get('title', ''),
+            'source': 'daraz'
+        }]))
+
+    if marketplace_products:
+        df = pd.DataFrame(marketplace_products)
+        if 'price_numeric' in df.columns:
+            df = df[df['price_numeric'].fillna(0) > 0]
+        else:
+            df = df.iloc[0:0]
+        if len(df):
+            platform = df.get('platform', pd.Series('Unknown', index=df.index)).fillna('Unknown')
+            lower = platform.str.lower()
+            # Last write wins, so apply in reverse priority order
+            emoji = pd.Series(_DEFAULT_EMOJI, index=df.index)
+            for keyword, icon in reversed(_PLATFORM_EMOJI):
+                emoji = emoji.mask(lower.str.contains(keyword, regex=False), icon)
+            frames.append(pd.DataFrame({
+                'Platform': emoji + ' ' + platform,
+                'price_numeric': df['price_numeric'],
+                'url': df.get('url', pd.Series('', index=df.index)).fillna(''),
+                'title': df.get('title', pd.Series('', index=df.index)).fillna(''),
+                'source': 'marketplace'
+            }))
+
+    if not frames:
+        return [], None, None
+
+    combined = pd.concat(frames, ignore_index=True)
+    # Sort by price (lowest to highest)
+    combined = combined.sort_values('price_numeric', kind='stable', ignore_index=True)
+    # NaN filtering upcasts to float; restore ints so "Rs. 50,000"
+    # renders without a trailing .0
+    prices = combined['price_numeric']
+    if (prices % 1 == 0).all():
+        combined['price_numeric'] = prices.astype('int64')
+    combined['Price (PKR)'] = 'Rs. ' + combined['price_numeric'].map('{:,}'.format)
+
+    n = len(combined)
+    ranks = ['🥇', '🥈', '🥉'][:n] + [f"{i + 1}." for i in range(3, n)]
+    diff = combined['price_numeric'] - combined['price_numeric'].iloc[0]
+    df_display = pd.DataFrame({
+        'Rank': ranks,
+        'Platform': combined['Platform'],
+        'Price (PKR)': combined['Price (PKR)'],
+        'Difference': diff.map(lambda s: "**Best Price!**" if s == 0 else f"+Rs. {s:,}")
+    })
+
+    all_products = combined.to_dict('records')
+
+    chart_rows = None
+    if len(all_products) > 1:
+        chart_rows = tuple(
+            (p['Platform'].split(' ', 1)[-1], p['price_numeric'])
+            for p in all_products
+        )
+
+    return all_products, df_display, chart_rows
+
+
+@st.cache_resource(show_spinner=False)
+def _bar_fig(query_id, chart_rows):
+    """Build the price-comparison bar chart once per query.
+
+    Figure construction allocates many dicts per trace; caching on
+    (query_id, rows) reuses the same Figure object across reruns.
+    """
+    # Deferred import: plotly costs several hundred ms at startup and is
+    # only needed once a chart is actually rendered.
+    import plotly.express as px
+
+    chart_data = pd.DataFrame(chart_rows, columns=['Platform', 'Price'])
+    fig = px.bar(
+        chart_data,
+        x='Platform',
+        y='Price',
+        title="Price Comparison Across Pakistani E-commerce Platforms",
+        color='Platform',
+        labels={'Price': 'Price (PKR)', 'Platform': 'Platform'},
+        template="plotly_white",
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_layout(
+        showlegend=False,
+        height=400,
+        xaxis_tickangle=-45,
+        title_font_size=16,
+        title_x=0.5
+    )
+    # Add price labels on bars
+    fig.update_traces(
+        texttemplate='Rs. %{y:,}',
+        textposition='outside'
+    )
+    return fig
+
+
+@lru_cache(maxsize=256)
+def _fmt_time(ts):
+    """HH:MM:SS for an ISO timestamp string.
+
+    The same timestamp is reformatted on every rerun of a result page;
+    lru_cache turns the repeat fromisoformat+strftime into a dict hit.
+    """
+    try:
+        return datetime.fromisoformat(ts.replace('Z', '+00:00')).strftime("%H:%M:%S")
+    except Exception:
+        return ts[:10]
+
+
 def display_price_comparison(results):
     """Display price comparison results in a modern way."""
     if not results or results.get('status') != 'completed':
@@ -191,10 +333,19 @@ def display_price_comparison(results):
         return
     
     results_data = results.get('results', {})
-    
+
+    # Bind the repeated lookups once up front; the rest of the function
+    # reads these locals instead of re-walking the nested dicts.
+    query_id = results.get('query_id', 'N/A')
+    duration = results.get('duration_seconds', 0)
+    execution_time = results.get('execution_time', 'N/A')
+    marketplace_products = results_data.get('marketplace_products', [])
+    daraz_product = results_data.get('daraz_product')
+    reports = results_data.get('reports_generated', [])
+    comparison_report = results_data.get('comparison_report', {})
+
     # Show warning if only Daraz results (Agent B might have failed)
-    marketplace_count = len(results_data.get('marketplace_products', []))
-    if marketplace_count == 0:
+    if not marketplace_products:
         st.warning("⚠️ Only Daraz results found. Other platforms search may have failed. Check your SERPER_API_KEY in Railway environment variables.")
 
     
@@ -211,7 +362,6 @@ def display_price_comparison(results):
         )
     
     with col2:
-        query_id = results.get('query_id', 'N/A')
         st.metric(
             label="🆔 Query ID", 
             value=query_id[:8] + "..." if len(query_id) > 8 else query_id,
@@ -219,7 +369,6 @@ def display_price_comparison(results):
         )
     
     with col3:
-        duration = results.get('duration_seconds', 0)
         st.metric(
             label="⏱️ Duration", 
             value=f"{duration:.1f}s",
@@ -227,18 +376,8 @@ def display_price_comparison(results):
         )
     
     with col4:
-        execution_time = results.get('execution_time', 'N/A')
-        if execution_time != 'N/A':
-            # Format timestamp to be more readable
-            try:
-                from datetime import datetime
-                dt = datetime.fromisoformat(execution_time.replace('Z', '+00:00'))
-                formatted_time = dt.strftime("%H:%M:%S")
-            except:
-                formatted_time = execution_time[:10]
-        else:
-            formatted_time = 'N/A'
-        
+        formatted_time = _fmt_time(execution_time) if execution_time != 'N/A' else 'N/A'
+
         st.metric(
             label="🕐 Completed At", 
             value=formatted_time,
@@ -247,8 +386,8 @@ def display_price_comparison(results):
     
     # Debug expander for troubleshooting
     with st.expander("🔧 Debug Info (Click if you're not seeing results from all platforms)"):
-        st.write("**Marketplace Products Count:**", len(results_data.get('marketplace_products', [])))
-        st.write("**Daraz Product:**", "Found" if results_data.get('daraz_product') else "Not found")
+        st.write("**Marketplace Products Count:**", len(marketplace_products))
+        st.write("**Daraz Product:**", "Found" if daraz_product else "Not found")
         
         # Show if Agent B failed
         if 'raw_results' in results:
@@ -264,7 +403,6 @@ def display_price_comparison(results):
     st.markdown("---")
     
     # Daraz Product Details - Clean and focused
-    daraz_product = results_data.get('daraz_product')
     if daraz_product:
         st.subheader("🛒 Featured Product from Daraz.pk")
         
@@ -309,122 +447,52 @@ def display_price_comparison(results):
     
     # Price comparison with enhanced table
     st.subheader("💰 Price Comparison Across Platforms")
-    cheapest_options = results_data.get('cheapest_options', [])
-    marketplace_products = results_data.get('marketplace_products', [])
-    
-    # Combine all products for display
-    all_products = []
-    
-    # Add Daraz product first (if available)
-    if daraz_product and daraz_product.get('price_numeric'):
-        all_products.append({
-            'Platform': '🛒 Daraz.pk',
-            'Price (PKR)': f"Rs. {daraz_product.get('price_numeric'):,}",
-            'price_numeric': daraz_product.get('price_numeric'),
-            'url': daraz_product.get('url', ''),
-            'title': daraz_product.get('title', ''),
-            'source': 'daraz'
-        })
-    
-    # Add marketplace products
-    for product in marketplace_products:
-        if product.get('price_numeric'):
-            platform_name = product.get('platform', 'Unknown')
-            # Add emoji based on platform
-            if 'olx' in platform_name.lower():
-                platform_name = f"🔄 {platform_name}"
-            elif 'priceoye' in platform_name.lower():
-                platform_name = f"💻 {platform_name}"
-            elif 'telemart' in platform_name.lower():
-                platform_name = f"📱 {platform_name}"
-            else:
-                platform_name = f"🏪 {platform_name}"
-                
-            all_products.append({
-                'Platform': platform_name,
-                'Price (PKR)': f"Rs. {product.get('price_numeric'):,}",
-                'price_numeric': product.get('price_numeric'),
-                'url': product.get('url', ''),
-                'title': product.get('title', ''),
-                'source': 'marketplace'
-            })
-    
+
+    all_products, df_display, chart_rows = _build_comparison(query_id, results_data)
+
     if all_products:
-        # Sort by price (lowest to highest)
-        all_products.sort(key=lambda x: x['price_numeric'])
-        
         # Create the main comparison table like in the report
         st.markdown("### � **Price Comparison (Lowest to Highest)**")
-        
-        # Create clean DataFrame for display
-        display_data = []
-        for i, product in enumerate(all_products):
-            rank = "🥇" if i == 0 else "🥈" if i == 1 else "🥉" if i == 2 else f"{i+1}."
-            savings = product['price_numeric'] - all_products[0]['price_numeric']
-            savings_text = "**Best Price!**" if savings == 0 else f"+Rs. {savings:,}"
-            
-            display_data.append({
-                'Rank': rank,
-                'Platform': product['Platform'],
-                'Price (PKR)': product['Price (PKR)'],
-                'Difference': savings_text
-            })
-        
-        # Display as a nice table
-        df_display = pd.DataFrame(display_data)
-        
-        st.dataframe(
-            df_display,
-            column_config={
-                "Rank": st.column_config.TextColumn("�", width="small"),
-                "Platform": st.column_config.TextColumn("Platform", width="medium"),
-                "Price (PKR)": st.column_config.TextColumn("� Price", width="medium"),
-                "Difference": st.column_config.TextColumn("💡 Savings", width="medium"),
-            },
-            hide_index=True,
-            use_container_width=True
-        )
-        
-        # Create price comparison chart
-        if len(all_products) > 1:
-            # Prepare data for chart
-            chart_data = pd.DataFrame([
-                {'Platform': p['Platform'].split(' ', 1)[-1], 'Price': p['price_numeric']} 
-                for p in all_products
-            ])
-            
-            fig = px.bar(
-                chart_data,
-                x='Platform',
-                y='Price',
-                title="Price Comparison Across Pakistani E-commerce Platforms",
-                color='Platform',
-                labels={'Price': 'Price (PKR)', 'Platform': 'Platform'},
-                template="plotly_white",
-                color_discrete_sequence=px.colors.qualitative.Set3
-            )
-            fig.update_layout(
-                showlegend=False,
-                height=400,
-                xaxis_tickangle=-45,
-                title_font_size=16,
-                title_x=0.5
-            )
-            # Add price labels on bars
-            fig.update_traces(
-                texttemplate='Rs. %{y:,}',
-                textposition='outside'
+
+        # The comparison rarely exceeds a handful of rows; st.table on
+        # plain records renders them as static HTML without the Arrow
+        # serialization + interactive grid the full widget drags in.
+        # Large result sets keep the scrollable dataframe.
+        if len(df_display) > 20:
+            st.dataframe(
+                df_display,
+                column_config={
+                    "Rank": st.column_config.TextColumn("�", width="small"),
+                    "Platform": st.column_config.TextColumn("Platform", width="medium"),
+                    "Price (PKR)": st.column_config.TextColumn("� Price", width="medium"),
+                    "Difference": st.column_config.TextColumn("💡 Savings", width="medium"),
+                },
+                hide_index=True,
+                use_container_width=True
             )
-            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.table(df_display.to_dict('records'))
+        
+        # Create price comparison chart (Figure cached per query)
+        if chart_rows is not None:
+            fig = _bar_fig(query_id, chart_rows)
+            # Stable key: without it the element's identity churns every
+            # rerun and Streamlit re-serializes and remounts the chart.
+            st.plotly_chart(fig, use_container_width=True, key=f"price_chart_{query_id}")
         
         # Price insights with better formatting
         if len(all_products) > 1:
             st.markdown("### 💡 **Price Insights**")
             col1, col2, col3 = st.columns(3)
             
-            min_price = all_products[0]['price_numeric']
-            max_price = all_products[-1]['price_numeric']
-            avg_price = sum(p['price_numeric'] for p in all_products) / len(all_products)
+            # Single contiguous array instead of three Python-level passes
+            prices = np.fromiter(
+                (p['price_numeric'] for p in all_products),
+                dtype=np.int64, count=len(all_products)
+            )
+            min_price = int(prices.min())
+            max_price = int(prices.max())
+            avg_price = float(prices.mean())
             
             with col1:
                 st.metric(
@@ -452,66 +520,22 @@ def display_price_comparison(results):
     
     # Market insights and reports
     st.markdown("---")
-    
+
     # Reports section - Enhanced
-    reports = results_data.get('reports_generated', [])
     if reports:
-        st.subheader("📄 Generated Reports & Analysis")
-        for i, report in enumerate(reports):
-            report_type = report.get('type', f'Report {i+1}')
-            with st.expander(f"📝 {report_type.replace('_', ' ').title()}", expanded=(i == 0)):
-                
-                # Show report metadata
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    if 'path' in report:
-                        st.info(f"📁 Saved to: `{report['path']}`")
-                with col2:
-                    if 'status' in report:
-                        status = report['status']
-                        if status == 'success':
-                            st.success("✅ Generated")
-                        elif status == 'partial_success':
-                            st.warning("⚠️ Partial")
-                        else:
-                            st.error("❌ Failed")
-                
-                # Show report content
-                content = report.get('content_preview', 'No preview available')
-                if content and len(content) > 100:
-                    st.markdown(content)
-                    
-                    # Download button
-                    if 'path' in report:
-                        try:
-                            report_path = Path(report['path'])
-                            if report_path.exists():
-                                with open(report_path, 'r', encoding='utf-8') as f:
-                                    full_content = f.read()
-                                st.download_button(
-                                    "📥 Download Full Report",
-                                    full_content,
-                                    file_name=report_path.name,
-                                    mime="text/markdown",
-                                    key=f"download_{i}"
-                                )
-                        except Exception as e:
-                            st.error(f"Could not load report file: {e}")
-                else:
-                    st.text(content or "No content available")
-    
+        _render_reports(reports)
+
     # Additional insights
-    comparison_report = results_data.get('comparison_report', {})
     if comparison_report:
         st.subheader("🎯 Key Insights")
-        
+
         # Best deals
         best_deals = results_data.get('best_deals', {})
         if best_deals:
             st.success("🏆 **Best Deal Found:**")
             for platform, deal in best_deals.items():
                 st.write(f"• **{platform}**: {deal}")
-        
+
         # Market insights
         market_insights = comparison_report.get('market_insights', {})
         if market_insights:
@@ -519,14 +543,99 @@ def display_price_comparison(results):
             for insight, value in market_insights.items():
                 if isinstance(value, str):
                     st.write(f"• **{insight.replace('_', ' ').title()}**: {value}")
-    
+
     # Database info
     st.markdown("---")
-    st.caption(f"💾 Analysis data saved to database with ID: {results.get('query_id', 'N/A')}")
+    st.caption(f"💾 Analysis data saved to database with ID: {query_id}")
     st.caption("📊 Data includes all scraped products, pricing trends, and market analysis")
 
+@st.fragment
+def _render_reports(reports):
+    """Reports section as a fragment.
+
+    Expander toggles and download clicks inside it rerun only this block
+    instead of replaying the whole page (comparison build, chart, etc.).
+    """
+    st.subheader("📄 Generated Reports & Analysis")
+    for i, report in enumerate(reports):
+        report_type = report.get('type', f'Report {i+1}')
+        with st.expander(f"📝 {report_type.replace('_', ' ').title()}", expanded=(i == 0)):
+
+            # Show report metadata
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                if 'path' in report:
+                    st.info(f"📁 Saved to: `{report['path']}`")
+            with col2:
+                if 'status' in report:
+                    status = report['status']
+                    if status == 'success':
+                        st.success("✅ Generated")
+                    elif status == 'partial_success':
+                        st.warning("⚠️ Partial")
+                    else:
+                        st.error("❌ Failed")
+
+            # Show report content
+            content = report.get('content_preview', 'No preview available')
+            if content and len(content) > 100:
+                st.markdown(content)
+
+                # Download button
+                if 'path' in report:
+                    try:
+                        report_path = Path(report['path'])
+                        if report_path.exists():
+                            full_content = _read_report_file(
+                                str(report_path), report_path.stat().st_mtime
+                            )
+                            st.download_button(
+                                "📥 Download Full Report",
+                                full_content,
+                                file_name=report_path.name,
+                                mime="text/markdown",
+                                key=f"download_{i}"
+                            )
+                    except Exception as e:
+                        st.error(f"Could not load report file: {e}")
+            else:
+                st.text(content or "No content available")
+
+@st.cache_data(show_spinner=False)
+def _read_report_file(path_str, mtime):
+    """Report file contents cached per (path, mtime).
+
+    The downloads loop otherwise re-reads every report from disk on every
+    rerun whether or not anyone clicks download; mtime in the key means
+    a regenerated report is picked up automatically.
+    """
+    return Path(path_str).read_text(encoding='utf-8')
+
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _cached_analysis(query, max_results, headless, timeout, index):
+    """UI-boundary cache around the full analysis pipeline.
+
+    Reruns happen whenever any widget changes; identical parameter tuples
+    should not relaunch a multi-second scrape. TTL keeps prices from
+    going stale for longer than 15 minutes.
+    """
+    return run_clean_marketplace_analysis(
+        query=query,
+        max_results=max_results,
+        headless=headless,
+        timeout=timeout,
+        index=index
+    )
+
+
+@st.cache_data(ttl=300, show_spinner=False)
 def check_api_configuration():
-    """Check if required API keys are configured."""
+    """Check if required API keys are configured.
+
+    Cached: the keys come from the environment / secrets and don't change
+    mid-session, so the probe doesn't need to run on every rerun.
+    """
     issues = []
     
     def get_key(key_name):
@@ -556,11 +665,48 @@ def check_api_configuration():
     
     return issues
 
+@st.fragment
+def _render_recent():
+    """Recent-searches list as a fragment.
+
+    Clicking an entry needs a full-page rerun to show its result, so the
+    handler stashes the picked entry in session state and escalates with
+    st.rerun(scope="app"); everything else (e.g. the 60s index-cache
+    refresh) stays scoped to this block.
+    """
+    recent_searches = load_recent_searches()
+    if not recent_searches:
+        return
+    st.caption("Recent searches")
+    # Dedupe on query so re-running the same search doesn't crowd the
+    # other entries out of the five visible slots; the short id makes a
+    # stable widget key (entries from before the index split fall back
+    # to their timestamp).
+    shown = set()
+    for search in recent_searches:
+        if len(shown) >= 5:
+            break
+        if search['query'] in shown:
+            continue
+        shown.add(search['query'])
+        if st.button(
+            f"🔄 {search['query']} ({search['timestamp'][:10]})",
+            key=f"recent_{search.get('id') or search['timestamp']}"
+        ):
+            st.session_state["_recent_pick"] = search
+            st.rerun(scope="app")
+
+
 def main():
     """Main Streamlit app."""
     # API keys are loaded at import time, no need to show warnings
     # The agents will handle validation when actually needed
-    
+
+    # Emitted every run: Streamlit drops elements that aren't re-emitted
+    # on a rerun, so a once-per-session guard loses the styling after
+    # the first full-page rerun.
+    st.markdown(_CSS, unsafe_allow_html=True)
+
     # Sidebar
     with st.sidebar:
         st.title("⚙️ Search Settings")
@@ -594,6 +740,13 @@ def main():
                 value=0,
                 help="Which Daraz result to analyze in detail"
             )
+
+            if st.checkbox(
+                "Force refresh",
+                value=False,
+                help="Ignore cached results and re-run the full analysis"
+            ):
+                _cached_analysis.clear()
     
     # Main content
     st.title("🛍️ Pakistani Price Tracker")
@@ -605,39 +758,51 @@ def main():
         placeholder="e.g., iPhone 15, Dell Laptop, Nike Air Max",
         help="Enter any product name to compare prices"
     )
-    
-    # Recent searches
-    recent_searches = load_recent_searches()
-    if recent_searches:
-        st.caption("Recent searches")
-        for search in recent_searches[:5]:
-            if st.button(
-                f"🔄 {search['query']} ({search['timestamp'][:10]})",
-                key=f"recent_{search['query']}_{search['timestamp']}"
-            ):
-                query = search['query']
-    
-    # Search button
-    if query:
+    search_clicked = st.button("🔍 Search", type="primary")
+
+    # Recent searches: serve the stored payload instead of re-running
+    # the pipeline; only entries without one (from before the
+    # index/payload split, or pruned) fall back to a fresh search.
+    _render_recent()
+    recent_pick = st.session_state.pop("_recent_pick", None)
+    if recent_pick:
+        stored = load_search_result(recent_pick)
+        if stored is not None:
+            st.session_state["_last_result"] = stored
+            # The sidebar settings at capture time are unknown
+            st.session_state["_last_q"] = None
+        else:
+            query = recent_pick['query']
+            search_clicked = True
+
+    # Analyses only launch on an explicit click (or a recent-search pick);
+    # reruns from sliders/checkboxes just redisplay the stored result.
+    if search_clicked and query:
         with st.spinner("🔍 Analyzing prices across Pakistani marketplaces..."):
             try:
-                # Run analysis (now synchronous)
-                result = run_clean_marketplace_analysis(
-                    query=query,
-                    max_results=max_results,
-                    headless=headless,
-                    timeout=timeout,
-                    index=index
-                )
-                
+                # Run analysis (cached per parameter tuple)
+                result = _cached_analysis(query, max_results, headless, timeout, index)
+                st.session_state["_last_q"] = (query, max_results, headless, timeout, index)
+                st.session_state["_last_result"] = result
+
                 # Save search
                 save_recent_search(query, result)
-                
+
                 # Display results
                 display_price_comparison(result)
-                
+
             except Exception as e:
                 st.error(f"Error during analysis: {str(e)}")
+    elif st.session_state.get("_last_result") is not None:
+        # Flag when the sidebar has drifted since the stored result was
+        # produced, so old numbers aren't mistaken for the new settings.
+        last_q = st.session_state.get("_last_q")
+        if last_q is not None and last_q[1:] != (max_results, headless, timeout, index):
+            st.caption(
+                f'⚙️ Showing results for "{last_q[0]}" with the settings in effect '
+                "at search time - press 🔍 Search to re-run with the current settings."
+            )
+        display_price_comparison(st.session_state["_last_result"])
     else:
         # Welcome message for first-time users
         st.info(